@@ -16,4 +16,4 @@ def _(msg):
 # Aliasing commonly used classes
 from specter.spec import Spec, DataSpec, fixture   # NOQA
 from specter.expect import expect, require, skip, skip_if  # NOQA
-from specter.expect import incomplete, metadata  # NOQA
+from specter.expect import incomplete, metadata, timeout  # NOQA
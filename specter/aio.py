@@ -0,0 +1,43 @@
+import asyncio
+import os
+import threading
+
+#: Number of async cases within a describe allowed to run at once
+DEFAULT_CONCURRENCY = 1
+
+_concurrency = DEFAULT_CONCURRENCY
+_local = threading.local()
+
+
+def get_concurrency():
+    return _concurrency
+
+
+def set_concurrency(concurrency):
+    """ Sets how many coroutine cases of a describe may overlap. """
+    global _concurrency
+    _concurrency = max(1, concurrency)
+
+
+def get_event_loop():
+    """ Returns the event loop for the current thread, creating it when
+    needed. Forked processes get a fresh loop rather than the parent's.
+    """
+    loop = getattr(_local, 'loop', None)
+    if loop is None or loop.is_closed() or _local.pid != os.getpid():
+        loop = asyncio.new_event_loop()
+        _local.loop = loop
+        _local.pid = os.getpid()
+    return loop
+
+
+def close_event_loop():
+    loop = getattr(_local, 'loop', None)
+    if loop is not None and _local.pid == os.getpid():
+        loop.close()
+    _local.loop = None
+
+
+def run(awaitable):
+    """ Runs an awaitable to completion on the current thread's loop. """
+    return get_event_loop().run_until_complete(awaitable)
@@ -0,0 +1,327 @@
+import collections
+import json
+import socket
+import sys
+from multiprocessing.connection import wait
+from time import sleep, time
+
+from specter import _, aio
+from specter.parallel import (ParallelManager, fail_cases, finish_describe,
+                              ignore_event)
+from specter.results import CaseResult
+
+
+def parse_address(value):
+    """ Splits a HOST:PORT string into a (host, port) tuple. """
+    host, _sep, port = value.rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError('Expected an address as HOST:PORT')
+    return host.strip('[]'), int(port)
+
+
+def encode(message):
+    return json.dumps(message).encode('utf-8') + b'\n'
+
+
+class WorkerConnection(object):
+    """ Coordinator side of the connection to a single worker. Messages are
+    JSON objects, one per line.
+    """
+
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.buffer = b''
+        self.batch = None
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def send(self, message):
+        self.sock.sendall(encode(message))
+
+    def receive(self):
+        """ Returns the messages received in full so far or None once the
+        worker has disconnected.
+        """
+        try:
+            data = self.sock.recv(64 * 1024)
+        except OSError:
+            data = None
+
+        if not data:
+            return None
+
+        lines = (self.buffer + data).split(b'\n')
+        self.buffer = lines.pop()
+        return [json.loads(line.decode('utf-8')) for line in lines if line]
+
+    def close(self):
+        self.sock.close()
+
+
+class DistributedManager(ParallelManager):
+    """ Coordinator that hands batches of case ids to workers connected over
+    TCP instead of local processes.
+
+    Workers scan the same suite, so only case ids are sent to them. Each
+    worker asks for work by sending the results of its previous batch, which
+    are then reported through the usual events. The batch of a worker that
+    disconnects is handed to the next worker asking for work.
+    """
+
+    #: Workers scan the suite themselves and call its hooks
+    inherits_state = False
+
+    def __init__(self, address, num_processes=6, duration_lookup=None,
+                 describe_affinity=False):
+        super(DistributedManager, self).__init__(
+            num_processes=num_processes, duration_lookup=duration_lookup,
+            describe_affinity=describe_affinity)
+        self.address = address
+        self.server = None
+        self.batches = collections.deque()
+        self.workers = []
+        self.idle_workers = collections.deque()
+
+    def listen(self):
+        """ Starts accepting workers and returns the bound address. """
+        if not self.server:
+            host, port = self.address
+            family = socket.AF_INET6 if ':' in host else socket.AF_INET
+            self.server = socket.socket(family, socket.SOCK_STREAM)
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.server.bind(self.address)
+            self.server.listen()
+        return self.server.getsockname()[:2]
+
+    def queue_batch(self, case_ids):
+        self.batches.append(case_ids)
+
+    def accept_worker(self):
+        sock, address = self.server.accept()
+        self.workers.append(WorkerConnection(sock, address))
+
+    def drop_worker(self, worker):
+        worker.close()
+        self.workers.remove(worker)
+        if worker in self.idle_workers:
+            self.idle_workers.remove(worker)
+        self.requeue_batch(worker)
+
+    def requeue_batch(self, worker):
+        """ Requeues whatever the worker didn't report back. """
+        if worker.batch:
+            remaining = [case_id for case_id in worker.batch
+                         if case_id not in self.completed_cases]
+            if remaining:
+                self.batches.appendleft(remaining)
+        worker.batch = None
+
+    def handle_messages(self, worker):
+        try:
+            messages = worker.receive()
+            if messages is None:
+                self.drop_worker(worker)
+                return
+
+            for message in messages:
+                if message.get('type') == 'ready':
+                    results = [CaseResult.from_dict(data)
+                               for data in message.get('results') or []]
+                    self.sync_results(results)
+                    self.requeue_batch(worker)
+                    self.idle_workers.append(worker)
+        except (ValueError, TypeError, KeyError):
+            # Malformed messages, e.g. from a worker with a different suite
+            self.drop_worker(worker)
+
+    def dispatch_batches(self):
+        while self.batches and self.idle_workers:
+            worker = self.idle_workers.popleft()
+            worker.batch = self.batches.popleft()
+            try:
+                worker.send({'type': 'batch', 'cases': worker.batch,
+                             'describe_affinity': self.describe_affinity})
+            except OSError:
+                self.drop_worker(worker)
+
+    def stop_workers(self):
+        for worker in list(self.workers):
+            try:
+                worker.send({'type': 'stop'})
+            except OSError:
+                pass
+            worker.close()
+        self.workers = []
+        self.idle_workers.clear()
+
+    def execute_all(self):
+        self.listen()
+        self.schedule_pending()
+
+        try:
+            while len(self.completed_cases) < len(self.case_wrappers):
+                for ready in wait([self.server] + self.workers):
+                    if ready is self.server:
+                        self.accept_worker()
+                    elif ready in self.workers:
+                        self.handle_messages(ready)
+
+                self.dispatch_batches()
+        finally:
+            self.stop_workers()
+            self.server.close()
+            self.server = None
+
+
+class DistributedWorker(object):
+    """ Runs the batches of case ids handed out by a coordinator. """
+
+    #: Seconds spent retrying to reach a coordinator that isn't up yet
+    CONNECT_TIMEOUT = 30.0
+
+    def __init__(self, address, all_cases):
+        self.address = address
+        self.all_cases = all_cases
+        self.prepared_parents = {}
+        self.worked = 0
+
+    def prepare_parent(self, case_wrappers):
+        """ The worker's suite doesn't carry the coordinator's state, so
+        before_all has to be called here as well. Returns False if it
+        failed, in which case its error has been recorded for every case.
+        """
+        parent = case_wrappers[0].parent
+        if parent.id in self.prepared_parents:
+            return True
+
+        try:
+            parent._call_hook('before_all')
+        except Exception as e:
+            fail_cases(case_wrappers, e)
+            return False
+        self.prepared_parents[parent.id] = parent
+        return True
+
+    def finish_parents(self):
+        """ Runs after_all for every describe prepared by this worker. """
+        for parent in reversed(list(self.prepared_parents.values())):
+            finish_describe(parent)
+        self.prepared_parents.clear()
+
+    def run_case(self, case_id):
+        case_wrapper = self.all_cases.get(case_id)
+        if case_wrapper is None:
+            # Reported as an error so it isn't handed to another worker
+            now = time()
+            return CaseResult(case_id, now, now, error=[
+                'Test {0} was not found by the worker'.format(case_id)
+            ]).to_dict()
+
+        if not self.prepare_parent([case_wrapper]):
+            return CaseResult.from_wrapper(case_wrapper).to_dict()
+
+        case_wrapper.parent._call_hook('before_each')
+        case_wrapper.execute(case_wrapper.parent._state)
+        case_wrapper.parent._call_hook('after_each')
+        self.worked += 1
+        return CaseResult.from_wrapper(case_wrapper).to_dict()
+
+    def run_cases(self, case_wrappers):
+        """ Runs the cases of a prepared describe, overlapping them when
+        they're all async.
+        """
+        parent = case_wrappers[0].parent
+        if len(case_wrappers) > 1 and parent.runs_concurrently:
+            aio.run(parent._execute_cases_async(
+                aio.get_concurrency(), case_wrappers, dispatch=ignore_event))
+            self.worked += len(case_wrappers)
+            return [CaseResult.from_wrapper(case_wrapper).to_dict()
+                    for case_wrapper in case_wrappers]
+        return [self.run_case(case_wrapper.id)
+                for case_wrapper in case_wrappers]
+
+    def run_pinned_batch(self, case_ids):
+        """ Runs every case of a describe along with its before_all and
+        after_all hooks.
+        """
+        case_wrappers = [self.all_cases[case_id] for case_id in case_ids]
+        describe = case_wrappers[0].parent
+        try:
+            describe._call_hook('before_all')
+        except Exception as e:
+            fail_cases(case_wrappers, e)
+            return [CaseResult.from_wrapper(case_wrapper).to_dict()
+                    for case_wrapper in case_wrappers]
+
+        self.prepared_parents[describe.id] = describe
+        results = self.run_cases(case_wrappers)
+        del self.prepared_parents[describe.id]
+        finish_describe(describe)
+        return results
+
+    def run_batch(self, message):
+        case_ids = message['cases']
+        if case_ids and all(case_id in self.all_cases
+                            for case_id in case_ids):
+            if message.get('describe_affinity'):
+                return self.run_pinned_batch(case_ids)
+
+            # Batches only ever hold cases of a single describe, so its
+            # before_all is only tried once for all of them
+            case_wrappers = [self.all_cases[case_id] for case_id in case_ids]
+            if not self.prepare_parent(case_wrappers):
+                return [CaseResult.from_wrapper(case_wrapper).to_dict()
+                        for case_wrapper in case_wrappers]
+            return self.run_cases(case_wrappers)
+        return [self.run_case(case_id) for case_id in case_ids]
+
+    def connect(self):
+        """ Returns a connection to the coordinator, or None if it couldn't
+        be reached within CONNECT_TIMEOUT.
+        """
+        give_up = time() + self.CONNECT_TIMEOUT
+        while True:
+            try:
+                return socket.create_connection(self.address)
+            except ConnectionRefusedError:
+                if time() >= give_up:
+                    break
+                sleep(0.1)
+
+        # Most likely the coordinator's run finished before this worker
+        # arrived, so there's nothing left to do
+        print(_('No coordinator is accepting workers on {0}:{1}').format(
+            *self.address), file=sys.stderr)
+        return None
+
+    def run(self):
+        sock = self.connect()
+        if sock is None:
+            return
+
+        reader = sock.makefile('rb')
+        try:
+            results = []
+            while True:
+                # A coordinator that's gone away has finished or failed,
+                # either way there's nothing left for this worker to do
+                try:
+                    sock.sendall(encode({'type': 'ready',
+                                         'results': results}))
+                    line = reader.readline()
+                except (ConnectionResetError, BrokenPipeError):
+                    return
+
+                if not line:
+                    return
+
+                message = json.loads(line.decode('utf-8'))
+                if message.get('type') != 'batch':
+                    return
+                results = self.run_batch(message)
+        finally:
+            reader.close()
+            sock.close()
+            self.finish_parents()
@@ -1,5 +1,4 @@
 import functools
-import inspect
 # Making sure we support 2.7 and 3+
 try:
     from types import ClassType as ClassObjType
@@ -7,19 +6,23 @@ except ImportError:
     from types import ModuleType as ClassObjType
 
 from specter import _
-from specter.spec import (CaseWrapper, FailedRequireException,
-                          TestSkippedException, TestIncompleteException)
-from specter.util import ExpectParams, get_module_and_line
+from specter.spec import (FailedRequireException, TestSkippedException,
+                          TestIncompleteException, get_current_case)
+from specter.util import get_module_and_line, resolve_expect_params
 
 
 class ExpectAssert(object):
+    __slots__ = ('prefix', 'target', '_src_params', 'src_location',
+                 'actions', 'success', 'used_negative', 'required',
+                 'caller_args', 'custom_msg', 'custom_report_vars', 'expected')
 
     def __init__(self, target, required=False, src_params=None,
-                 caller_args=[]):
+                 caller_args=[], src_location=None):
         super(ExpectAssert, self).__init__()
         self.prefix = _('expect')
         self.target = target
-        self.src_params = src_params
+        self._src_params = src_params
+        self.src_location = src_location
         self.actions = [target]
         self.success = False
         self.used_negative = False
@@ -28,6 +31,16 @@ class ExpectAssert(object):
         self.custom_msg = None
         self.custom_report_vars = {}
 
+    @property
+    def src_params(self):
+        """Source parameters are only resolved once they're needed (e.g.
+        on failure or when reporting) from the recorded source location.
+        """
+        if self._src_params is None and self.src_location:
+            self._src_params = resolve_expect_params(self.src_location)
+            self.src_location = None
+        return self._src_params
+
     @property
     def target_src_param(self):
         if self.src_params and self.src_params.expect_arg:
@@ -179,24 +192,26 @@ class ExpectAssert(object):
 
 
 class RequireAssert(ExpectAssert):
+    __slots__ = ()
 
-    def __init__(self, target, src_params=None, caller_args=[]):
+    def __init__(self, target, src_params=None, caller_args=[],
+                 src_location=None):
         super(RequireAssert, self).__init__(target=target, required=True,
                                             src_params=src_params,
-                                            caller_args=caller_args)
+                                            caller_args=caller_args,
+                                            src_location=src_location)
         self.prefix = _('require')
 
 
 def _add_expect_to_wrapper(obj_to_add):
-    try:
-        for frame in inspect.stack():
-            if frame[3] == 'execute':
-                wrapper = frame[0].f_locals.get('self')
-                if type(wrapper) is CaseWrapper:
-                    wrapper.expects.append(obj_to_add)
-    except Exception as error:
-        raise Exception(_('Error attempting to add expect to parent '
-                        'wrapper: {err}').format(err=error))
+    wrapper = get_current_case()
+    if wrapper is not None:
+        wrapper.expects.append(obj_to_add)
+
+
+def _get_src_location():
+    line, module = get_module_and_line('__spec__', steps=3)
+    return line, getattr(module, '__name__', None)
 
 
 def expect(obj, caller_args=[]):
@@ -205,12 +220,9 @@ def expect(obj, caller_args=[]):
     :param obj: The evaluated target object
     :param caller_args: Is only used when using expecting a raised Exception
     """
-    line, module = get_module_and_line('__spec__')
-    src_params = ExpectParams(line, module)
-
     expect_obj = ExpectAssert(
         obj,
-        src_params=src_params,
+        src_location=_get_src_location(),
         caller_args=caller_args
     )
     _add_expect_to_wrapper(expect_obj)
@@ -223,12 +235,9 @@ def require(obj, caller_args=[]):
     :param obj: The evaluated target object
     :param caller_args: Is only used when using expecting a raised Exception
     """
-    line, module = get_module_and_line('__spec__')
-    src_params = ExpectParams(line, module)
-
     require_obj = RequireAssert(
         obj,
-        src_params=src_params,
+        src_location=_get_src_location(),
         caller_args=caller_args
     )
     _add_expect_to_wrapper(require_obj)
@@ -294,6 +303,31 @@ def incomplete(test_func):
         return skip_wrapper
 
 
+def timeout(seconds):
+    """The timeout decorator bounds how long a test may run for. Tests that
+    run longer are stopped and reported as errors. When applied to a Spec or
+    Describe, it sets the timeout for all of its tests.
+
+    .. code-block:: python
+
+        # Example of using the timeout decorator
+        @timeout(5)
+        def it_should_respond_quickly(self):
+            pass
+
+    :param seconds: Expects a number of seconds
+    """
+    def decorator(test_func):
+        target = test_func
+        if test_func.__name__ == 'DECORATOR_ONCALL':
+            # The metadata decorator hides the real function
+            target = test_func()[0]
+
+        target.__specter_timeout__ = seconds
+        return test_func
+    return decorator
+
+
 def metadata(**key_value_pairs):
     """The metadata decorator allows for you to tag specific tests with
     key/value data for run-time processing or reporting. The common use case
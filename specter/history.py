@@ -0,0 +1,76 @@
+import json
+import os
+
+from specter.spec import TestEvent
+
+DEFAULT_CACHE_DIR = '.specter_cache'
+
+
+class DurationHistory(object):
+    """ Local on-disk store of historical test case durations.
+
+    Durations are tracked as a rolling average per case, keyed by the
+    parent's class path and the case name.
+    """
+    FILENAME = 'durations.json'
+
+    #: Number of runs the rolling average is computed over
+    WINDOW = 10
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, path=None):
+        super(DurationHistory, self).__init__()
+        self.path = path or os.path.join(cache_dir, self.FILENAME)
+        self.durations = {}
+        self.load()
+
+    @staticmethod
+    def key_for(case):
+        return '{path}.{name}'.format(path=case.parent.real_class_path,
+                                      name=case.case_func.__name__)
+
+    def load(self):
+        try:
+            with open(self.path) as handle:
+                self.durations = json.load(handle)
+        except (IOError, ValueError):
+            self.durations = {}
+
+    def save(self):
+        cache_dir = os.path.dirname(self.path)
+        if cache_dir and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+        # Write to a temp file first so that an interrupted run can't
+        # leave a corrupted history behind.
+        tmp_path = '{0}.{1}.tmp'.format(self.path, os.getpid())
+        with open(tmp_path, 'w') as handle:
+            json.dump(self.durations, handle)
+        os.replace(tmp_path, self.path)
+
+    def get(self, case):
+        """ Returns the average duration of a case or None if unknown."""
+        entry = self.durations.get(self.key_for(case))
+        return entry['average'] if entry else None
+
+    def record(self, case):
+        if not case.complete or case.skipped or case.incomplete:
+            return
+
+        entry = self.durations.setdefault(self.key_for(case),
+                                          {'average': 0.0, 'runs': 0})
+        runs = min(entry['runs'] + 1, self.WINDOW)
+        entry['average'] += (case.elapsed_time - entry['average']) / runs
+        entry['runs'] = runs
+
+    def slowest(self, count=10):
+        """ Returns a list of (case key, average duration) tuples."""
+        averages = [(key, entry['average'])
+                    for key, entry in self.durations.items()]
+        averages.sort(key=lambda item: item[1], reverse=True)
+        return averages[:count]
+
+    def subscribe_to_spec(self, spec):
+        spec.add_listener(TestEvent.COMPLETE, self.test_complete)
+
+    def test_complete(self, evt):
+        self.record(evt.payload)
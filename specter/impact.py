@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+
+from specter.spec import TestEvent
+
+
+class ImpactMap(object):
+    """ Local store mapping each case to the source files it covered.
+
+    The map is built from coverage.py dynamic contexts, where each context
+    is either a case id or a describe id (for code run by its hooks). On
+    later runs, only the cases that covered a changed file, new cases and
+    previously failing cases need to be executed.
+    """
+    FILENAME = 'impact.json'
+    COVERAGE_FILENAME = 'impact.coverage'
+
+    def __init__(self, cache_dir):
+        super(ImpactMap, self).__init__()
+        self.path = os.path.join(cache_dir, self.FILENAME)
+        self.coverage_file = os.path.join(cache_dir, self.COVERAGE_FILENAME)
+        self.case_files = {}
+        self.file_stamps = {}
+        self.failed_cases = set()
+        self.completed_cases = set()
+        self._changed_files = None
+        self.load()
+
+        # Coverage data for the run is also stored in the cache directory
+        if cache_dir and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    @property
+    def has_history(self):
+        return bool(self.case_files)
+
+    def load(self):
+        try:
+            with open(self.path) as handle:
+                data = json.load(handle)
+        except (IOError, ValueError):
+            return
+
+        self.case_files = data.get('cases', {})
+        self.file_stamps = data.get('files', {})
+        self.failed_cases = set(data.get('failed', []))
+
+    def save(self):
+        cache_dir = os.path.dirname(self.path)
+        if cache_dir and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+        data = {
+            'cases': self.case_files,
+            'files': self.file_stamps,
+            'failed': sorted(self.failed_cases)
+        }
+
+        tmp_path = '{0}.{1}.tmp'.format(self.path, os.getpid())
+        with open(tmp_path, 'w') as handle:
+            json.dump(data, handle)
+        os.replace(tmp_path, self.path)
+
+    def get_file_digest(self, filename):
+        digest = hashlib.sha1()
+        with open(filename, 'rb') as handle:
+            for chunk in iter(lambda: handle.read(65536), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get_file_stamp(self, filename, previous=None):
+        """ Returns [mtime, size, sha1] or None if the file is missing. The
+        digest of the previous stamp is reused when mtime and size match.
+        """
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+
+        if previous and previous[:2] == [stat.st_mtime, stat.st_size]:
+            return previous
+        return [stat.st_mtime, stat.st_size, self.get_file_digest(filename)]
+
+    def is_changed(self, filename):
+        previous = self.file_stamps.get(filename)
+        current = self.get_file_stamp(filename, previous)
+        return not previous or not current or current[2] != previous[2]
+
+    def dependencies(self):
+        """ Returns {filename: set of case ids} for every file a case
+        depends on.
+        """
+        dependents = {}
+        for case_id, files in self.case_files.items():
+            for filename in files:
+                dependents.setdefault(filename, set()).add(case_id)
+        return dependents
+
+    def changed_files(self):
+        # Files without a stamp haven't been seen by all of their cases
+        if self._changed_files is None:
+            self._changed_files = set(filename
+                                      for filename in self.dependencies()
+                                      if self.is_changed(filename))
+        return self._changed_files
+
+    def is_affected(self, case_id):
+        files = self.case_files.get(case_id)
+        if files is None or case_id in self.failed_cases:
+            return True
+        return not self.changed_files().isdisjoint(files)
+
+    def select(self, case_ids):
+        """ Returns the subset of case ids that need to be executed."""
+        return set(case_id for case_id in case_ids
+                   if self.is_affected(case_id))
+
+    def record_coverage(self, data, describe_cases, case_ids=None):
+        """ Updates the map from coverage data recorded with dynamic contexts.
+
+        :param data: coverage.py CoverageData instance
+        :param describe_cases: Dict of describe id to its list of case ids
+        :param case_ids: Ids of every case in the suites, selected or not.
+            Entries of any other case, e.g. one that was deleted or renamed,
+            are dropped.
+        """
+        # Cases that no longer exist would otherwise hold back the stamps
+        # of their files forever
+        if case_ids is not None:
+            case_ids = set(case_ids)
+            self.case_files = dict(
+                (case_id, files) for case_id, files in self.case_files.items()
+                if case_id in case_ids)
+            self.failed_cases &= case_ids
+
+        recorded = {}
+        for filename in data.measured_files():
+            contexts = set()
+            for line_contexts in data.contexts_by_lineno(filename).values():
+                contexts.update(line_contexts)
+
+            for context in contexts:
+                for case_id in describe_cases.get(context, [context]):
+                    recorded.setdefault(case_id, set()).add(filename)
+
+        # Cases that ran without covering anything still get an entry
+        for case_id in self.completed_cases:
+            recorded.setdefault(case_id, set())
+
+        recorded.pop('', None)
+        if case_ids is not None:
+            recorded = dict((case_id, files)
+                            for case_id, files in recorded.items()
+                            if case_id in case_ids)
+        for case_id, files in recorded.items():
+            self.case_files[case_id] = sorted(files)
+
+        # A file is only up to date once every case depending on it has run
+        # against its current contents. Otherwise the cases that didn't run
+        # would be skipped on the next run.
+        ran = self.completed_cases | set(recorded)
+        stamps = {}
+        for filename, dependents in self.dependencies().items():
+            previous = self.file_stamps.get(filename)
+            if dependents <= ran:
+                stamp = self.get_file_stamp(filename, previous)
+            else:
+                stamp = previous
+
+            if stamp:
+                stamps[filename] = stamp
+        self.file_stamps = stamps
+        self._changed_files = None
+
+    def subscribe_to_spec(self, spec):
+        spec.add_listener(TestEvent.COMPLETE, self.test_complete)
+
+    def test_complete(self, evt):
+        case = evt.payload
+        self.completed_cases.add(case.id)
+        if case.success:
+            self.failed_cases.discard(case.id)
+        else:
+            self.failed_cases.add(case.id)
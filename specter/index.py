@@ -0,0 +1,226 @@
+import re
+
+from specter import _
+
+TOKEN_PATTERN = re.compile(
+    r'\(|\)|[^\s()=]+=(?:"[^"]*"|\'[^\']*\'|[^\s()]*)|[^\s()]+')
+OPERATORS = ('and', 'or', 'not')
+
+
+class SuiteIndex(object):
+    """ Lookup tables over every case of a suite, built in a single walk of
+    its tree. Selections are answered with set operations on case ids.
+    """
+
+    def __init__(self, suite):
+        self.suite = suite
+        self.cases = {}
+        self.paths = {}
+        self.by_name = {}
+        self.by_metadata = {}
+        self.by_metadata_key = {}
+        self.unhashable_metadata = []
+
+        describes = [(suite, (suite.id,))]
+        while describes:
+            describe, path = describes.pop()
+            describes.extend((child, path + (child.id,))
+                             for child in describe.describes)
+
+            for case_id, case in describe.cases.items():
+                self.add_case(case, path)
+
+    @property
+    def case_ids(self):
+        return set(self.cases)
+
+    def add_case(self, case, path):
+        self.cases[case.id] = case
+        self.paths[case.id] = path
+
+        for name in set((case.name, case.pretty_name)):
+            self.by_name.setdefault(name, set()).add(case.id)
+
+        for key, value in case.metadata.items():
+            self.by_metadata_key.setdefault(key, set()).add(case.id)
+            try:
+                self.by_metadata.setdefault((key, value), set()).add(case.id)
+            except TypeError:
+                self.unhashable_metadata.append((key, value, case.id))
+
+    def named(self, names):
+        found = set()
+        for name in names:
+            found |= self.by_name.get(name, set())
+        return found
+
+    def with_metadata(self, key, value):
+        found = set(case_id for meta_key, meta_value, case_id
+                    in self.unhashable_metadata
+                    if meta_key == key and meta_value == value)
+        try:
+            found |= self.by_metadata.get((key, value), set())
+        except TypeError:
+            pass
+        return found
+
+    def with_metadata_key(self, key):
+        return set(self.by_metadata_key.get(key, set()))
+
+    def with_any_metadata(self, meta):
+        found = set()
+        for key, value in meta.items():
+            found |= self.with_metadata(key, value)
+        return found
+
+    def select(self, names=None, metadata=None, expression=None, ids=None):
+        """ Returns the ids of the cases matching every given selector, or
+        None if nothing was selected on.
+        """
+        selections = []
+        if names:
+            selections.append(self.named(names))
+        if metadata:
+            selections.append(self.with_any_metadata(metadata))
+        if expression:
+            selections.append(expression.evaluate(self))
+        if ids is not None:
+            selections.append(self.case_ids & set(ids))
+
+        if not selections:
+            return None
+        return set.intersection(*selections)
+
+    def describes_containing(self, case_ids):
+        containing = set()
+        for case_id in case_ids:
+            containing.update(self.paths.get(case_id, ()))
+        return containing
+
+    def prune(self, case_ids):
+        """ Removes every case not in case_ids from the suite, along with
+        the describes left without any cases below them.
+        """
+        containing = self.describes_containing(case_ids)
+        describes = [self.suite]
+        while describes:
+            describe = describes.pop()
+            describe.cases = dict((case_id, case) for case_id, case
+                                  in describe.cases.items()
+                                  if case_id in case_ids)
+            describe.describes = [child for child in describe.describes
+                                  if child.id in containing]
+            describes.extend(describe.describes)
+
+
+class MetadataTerm(object):
+
+    def __init__(self, key, value=None):
+        self.key = key
+        self.value = value
+
+    def evaluate(self, index):
+        if self.value is None:
+            return index.with_metadata_key(self.key)
+        return index.with_metadata(self.key, self.value)
+
+
+class NotExpression(object):
+
+    def __init__(self, operand):
+        self.operand = operand
+
+    def evaluate(self, index):
+        return index.case_ids - self.operand.evaluate(index)
+
+
+class AndExpression(object):
+
+    def __init__(self, operands):
+        self.operands = operands
+
+    def evaluate(self, index):
+        return set.intersection(*[operand.evaluate(index)
+                                  for operand in self.operands])
+
+
+class OrExpression(object):
+
+    def __init__(self, operands):
+        self.operands = operands
+
+    def evaluate(self, index):
+        return set.union(*[operand.evaluate(index)
+                           for operand in self.operands])
+
+
+class ExpressionParser(object):
+    """ Parses metadata expressions such as
+    ``test=smoke and not (db=postgres or slow)``. A bare key matches every
+    case that has it. ``not`` binds tighter than ``and``, which binds
+    tighter than ``or``.
+    """
+
+    def __init__(self, text):
+        self.tokens = TOKEN_PATTERN.findall(text)
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError(_('Unexpected end of expression'))
+        self.position += 1
+        return token
+
+    def parse(self):
+        expression = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(
+                _('Unexpected "{0}" in expression').format(self.peek()))
+        return expression
+
+    def parse_or(self):
+        operands = [self.parse_and()]
+        while self.peek() == 'or':
+            self.take()
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else OrExpression(operands)
+
+    def parse_and(self):
+        operands = [self.parse_not()]
+        while self.peek() == 'and':
+            self.take()
+            operands.append(self.parse_not())
+        return operands[0] if len(operands) == 1 else AndExpression(operands)
+
+    def parse_not(self):
+        if self.peek() == 'not':
+            self.take()
+            return NotExpression(self.parse_not())
+        return self.parse_term()
+
+    def parse_term(self):
+        token = self.take()
+        if token == '(':
+            expression = self.parse_or()
+            if self.take() != ')':
+                raise ValueError(_('Expected ")" in expression'))
+            return expression
+
+        if token == ')' or token in OPERATORS:
+            raise ValueError(
+                _('Unexpected "{0}" in expression').format(token))
+
+        key, sep, value = token.partition('=')
+        if not key:
+            raise ValueError(_('Missing metadata key in "{0}"').format(token))
+        return MetadataTerm(key, value.strip('"\'') if sep else None)
+
+
+def parse_expression(text):
+    """ Returns an expression that can be evaluated against a SuiteIndex. """
+    return ExpressionParser(text).parse()
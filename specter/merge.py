@@ -0,0 +1,116 @@
+import argparse
+import json
+import sys
+from xml.etree.ElementTree import Element, fromstring, tostring
+
+from specter import _
+from specter.reporting.specter_json import FORMAT_VERSION
+from specter.reporting.xunit import XUnitReporter
+
+SUITE_COUNTS = ('tests', 'errors', 'failures', 'skipped')
+
+
+def merge_specs(merged, specs):
+    """ Merges serialized specs into the merged list. A spec that was split
+    across shards is combined with its existing entry by id.
+    """
+    by_id = dict((spec['id'], spec) for spec in merged)
+    for spec in specs:
+        existing = by_id.get(spec['id'])
+        if existing is None:
+            merged.append(spec)
+            by_id[spec['id']] = spec
+            continue
+
+        case_ids = set(case['id'] for case in existing['cases'])
+        existing['cases'].extend(case for case in spec['cases']
+                                 if case['id'] not in case_ids)
+        merge_specs(existing['specs'], spec['specs'])
+    return merged
+
+
+def merge_json(reports):
+    """ Combines Specter JSON reports into a single report. """
+    specs = []
+    for report in reports:
+        if report.get('format') != 'specter':
+            raise ValueError(_('Not a Specter JSON report'))
+        merge_specs(specs, report['specs'])
+
+    return {
+        'format': 'specter',
+        'version': FORMAT_VERSION,
+        'specs': specs
+    }
+
+
+def suite_key(suite):
+    """ Suites are named after their describe, which isn't unique, so the
+    class path of their test cases is used to tell them apart.
+    """
+    test_case = suite.find('testcase')
+    classname = test_case.get('classname') if test_case is not None else None
+    return suite.get('name'), classname
+
+
+def merge_xunit(documents):
+    """ Combines xUnit testsuites elements into a single one. """
+    merged = Element('testsuites')
+    suites = {}
+    for document in documents:
+        for suite in document.iter('testsuite'):
+            key = suite_key(suite)
+            existing = suites.get(key)
+            if existing is None:
+                suites[key] = suite
+                merged.append(suite)
+                continue
+
+            for count in SUITE_COUNTS:
+                total = int(existing.get(count, 0)) + int(suite.get(count, 0))
+                existing.set(count, str(total))
+            total_time = (float(existing.get('time', 0)) +
+                          float(suite.get('time', 0)))
+            existing.set('time', str(total_time))
+            existing.extend(suite.findall('testcase'))
+    return merged
+
+
+def main(args=None):  # pragma: no cover
+    parser = argparse.ArgumentParser(
+        description=_('Merges the Specter JSON or xUnit results of sharded '
+                      'runs into a single file.'))
+    parser.add_argument(
+        '--format', dest='format', choices=['json', 'xunit'], default=None,
+        help=_('Format of the results (default: xunit for .xml outputs, '
+               'json otherwise)'))
+    parser.add_argument('output', help=_('Merged results file'))
+    parser.add_argument('inputs', nargs='+', help=_('Results files to merge'))
+    arguments = parser.parse_args(args)
+
+    result_format = arguments.format
+    if not result_format:
+        is_xml = arguments.output.endswith('.xml')
+        result_format = 'xunit' if is_xml else 'json'
+
+    if result_format == 'json':
+        reports = []
+        for path in arguments.inputs:
+            with open(path) as handle:
+                reports.append(json.load(handle))
+
+        with open(arguments.output, 'w') as handle:
+            json.dump(merge_json(reports), handle)
+    else:
+        documents = []
+        for path in arguments.inputs:
+            with open(path, 'rb') as handle:
+                documents.append(fromstring(handle.read()))
+
+        with open(arguments.output, 'w', encoding='utf8') as handle:
+            handle.write(XUnitReporter.XML_HEADER)
+            handle.write(tostring(merge_xunit(documents), encoding='unicode'))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main(sys.argv[1:])
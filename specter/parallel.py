@@ -1,44 +1,343 @@
+import collections
 import multiprocessing as mp
+import pickle
+import queue
+import sys
 import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import wait
 from time import time
 
 from coverage import coverage
-from specter.spec import TestEvent, DescribeEvent
+from specter import aio
+from specter.results import CaseResult
+from specter.spec import (TestEvent, DescribeEvent, TestTimeoutException,
+                          set_default_timeout)
 
 
-class ExecuteTestProcess(mp.Process):
+class WorkerCrashedException(Exception):
+    def __init__(self, exitcode):
+        super(WorkerCrashedException, self).__init__(
+            'Worker process exited unexpectedly (exit code {0})'.format(
+                exitcode))
+        self.exitcode = exitcode
+
+
+def fail_cases(case_wrappers, exception):
+    """ Records an exception raised outside of the cases, e.g. by the
+    before_all of their describe, against every one of them. Must be called
+    from within the except block that caught it.
+    """
+    error = None
+    for case_wrapper in case_wrappers:
+        case_wrapper.start()
+        if error is None:
+            case_wrapper._handle_exception(exception)
+            error = case_wrapper.error
+        else:
+            case_wrapper.error = error
+        case_wrapper.stop()
+
+
+def finish_describe(describe):
+    """ Runs after_all for a describe pinned to a worker. Its cases have
+    already been reported, so a failure is only printed by the worker.
+    """
+    try:
+        describe._call_hook('after_all')
+    except Exception:
+        traceback.print_exc()
+
+
+def ignore_event(evt):
+    """ Stands in for the dispatch of events that are reported elsewhere."""
+
+
+def number_suite(suite, occurrences):
+    """ Gives repeated instances of a suite within a run their own ids.
+    occurrences counts the suites numbered so far by their original id.
+    """
+    occurrence = occurrences.get(suite.id, 0)
+    occurrences[suite.id] = occurrence + 1
+    if occurrence:
+        suite._assign_occurrence(occurrence)
+
+
+class SuiteLocator(object):
+    """ Allows workers that can't inherit the parent's memory (e.g. under the
+    spawn or forkserver start methods) to rebuild the suite themselves. Case
+    and describe ids are deterministic, so the rebuilt suite shares its ids
+    with the coordinator.
+    """
+
+    def __init__(self, suite_types):
+        self.suite_types = list(suite_types)
+
+    @property
+    def module_names(self):
+        return sorted(set(cls.__module__ for cls in self.suite_types))
+
+    def locate(self):
+        """ Returns the (all_cases, all_parents) lookup tables."""
+        all_cases, all_parents = {}, {}
+
+        # Numbered in the same order as the coordinator registered them
+        describes, occurrences = [], {}
+        for suite_type in self.suite_types:
+            suite = suite_type()
+            number_suite(suite, occurrences)
+            describes.append(suite)
+
+        while describes:
+            describe = describes.pop()
+            describes.extend(describe.describes)
+
+            all_parents[describe.id] = describe
+            all_cases.update(describe.cases)
+
+        return all_cases, all_parents
+
+
+class ExecuteTestProcess(object):
+    """ Runs batches of cases taken from the work queue in a process created
+    through the requested multiprocessing context.
+    """
+
+    #: Max number of results buffered before they're sent
+    FLUSH_COUNT = 100
+
+    #: Max size in bytes of the buffered results before they're sent
+    FLUSH_BYTES = 1024 * 1024
+
+    #: Max number of seconds results are held back for
+    FLUSH_INTERVAL = 0.05
+
     def __init__(self, work_queue, all_cases, all_parents,
-                 pipe, track_coverage=False, coverage_omit=None):
+                 pipe, track_coverage=False, coverage_omit=None,
+                 start_method=None, suite_locator=None,
+                 coverage_data_file=None, record_contexts=False,
+                 case_timeout=None, describe_affinity=False,
+                 async_concurrency=aio.DEFAULT_CONCURRENCY):
         super(ExecuteTestProcess, self).__init__()
+        self.process = None
         self.work_queue = work_queue
         self.all_cases = all_cases
         self.all_parents = all_parents
-        self.worked = mp.Value('i', 0)
+        self.start_method = start_method
+        self.suite_locator = suite_locator
+        self.case_timeout = case_timeout
+        self.describe_affinity = describe_affinity
+        self.async_concurrency = max(1, async_concurrency)
+
+        # Shared with the manager so that it can supervise the worker. The
+        # current batch is named by its first case. Each running case takes
+        # a slot, of which there's one per case that may run concurrently.
+        # Start times are reset once the case or the before_all of the
+        # batch's describe finishes.
+        context = mp.get_context(start_method)
+        self.worked = context.Value('i', 0)
+        self.current_batch = context.Array('c', 64)
+        self.current_cases = [context.Array('c', 64)
+                              for slot in range(self.async_concurrency)]
+        self.cases_started = context.Array('d', self.async_concurrency)
+        self.describe_started = context.Value('d', 0.0)
+        self.case_slots = {}
         self.pipe = pipe
+        self.track_coverage = track_coverage
+        self.coverage_omit = coverage_omit
+        self.coverage_data_file = coverage_data_file
+        self.record_contexts = record_contexts
         self.coverage = None
 
         if track_coverage:
-            self.coverage = coverage(omit=coverage_omit, data_suffix=True)
-            self.coverage._warn_no_data = False
+            self.coverage = self.create_coverage()
+
+    def create_coverage(self):
+        kwargs = {}
+        if self.coverage_data_file:
+            kwargs['data_file'] = self.coverage_data_file
+
+        cov = coverage(omit=self.coverage_omit, data_suffix=True, **kwargs)
+        cov._warn_no_data = False
+        return cov
+
+    def start(self):
+        context = mp.get_context(self.start_method)
+        self.process = context.Process(target=self.run)
+        self.process.start()
+
+    def join(self, timeout=None):
+        self.process.join(timeout)
+
+    def kill(self):
+        self.process.kill()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    @property
+    def exitcode(self):
+        return self.process.exitcode
+
+    @property
+    def sentinel(self):
+        return self.process.sentinel
+
+    def __getstate__(self):
+        # Coverage can't be pickled, so spawned workers re-create it. The
+        # process handle only exists on the manager's side.
+        state = dict(self.__dict__)
+        state['coverage'] = None
+        state['process'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.track_coverage:
+            self.coverage = self.create_coverage()
+
+    def prepare_parent(self, batch):
+        """ Rebuilt suites don't carry the coordinator's state, so their
+        before_all has to be called in the worker. Returns False if it
+        failed, in which case its error has been reported for every case.
+        """
+        parent = self.all_cases[batch[0]].parent
+        if not self.suite_locator or parent.id in self.prepared_parents:
+            return True
+
+        try:
+            parent._call_hook('before_all')
+        except Exception as e:
+            self.fail_batch(batch, e)
+            return False
+        self.prepared_parents[parent.id] = parent
+        return True
+
+    def finish_parents(self):
+        """ Runs after_all for every describe prepared by this worker. """
+        for parent in reversed(list(self.prepared_parents.values())):
+            finish_describe(parent)
+        self.prepared_parents.clear()
+
+    def start_describe(self, batch):
+        """ Runs before_all for a describe whose cases are all run by this
+        worker. Returns the describe or None if before_all failed, in which
+        case its error has been reported for every case.
+        """
+        parent = self.all_cases[batch[0]].parent
+        try:
+            parent._call_hook('before_all')
+        except Exception as e:
+            self.fail_batch(batch, e)
+            return None
+        return parent
+
+    def fail_batch(self, batch, exception):
+        """ Reports an error raised by the before_all of the batch's
+        describe for each of its cases. Must be called from within the
+        except block that caught it.
+        """
+        case_wrappers = [self.all_cases[case_id] for case_id in batch]
+        fail_cases(case_wrappers, exception)
+        for case_wrapper in case_wrappers:
+            self.buffer_result(case_wrapper)
+        self.flush_results()
+
+    def in_flight(self):
+        """ Returns {case id: start time} for the cases being run."""
+        return dict((self.current_cases[slot].value.decode(), started)
+                    for slot, started in enumerate(self.cases_started)
+                    if started)
+
+    def start_case(self, case_wrapper):
+        slot = list(self.cases_started).index(0.0)
+        self.case_slots[case_wrapper.id] = slot
+        self.current_cases[slot].value = case_wrapper.id.encode()
+        self.cases_started[slot] = time()
+
+        if self.record_contexts and self.coverage:
+            self.coverage.switch_context(case_wrapper.id)
+
+    def finish_case(self, case_wrapper):
+        slot = self.case_slots.pop(case_wrapper.id)
+        self.cases_started[slot] = 0.0
+        self.worked.value += 1
+        self.buffer_result(case_wrapper)
+
+    def track_event(self, evt):
+        """ Receives the events of cases run concurrently by their
+        describe.
+        """
+        if evt.name == TestEvent.START:
+            self.start_case(evt.payload)
+        else:
+            self.finish_case(evt.payload)
+
+    def run_cases(self, batch):
+        case_wrappers = [self.all_cases[case_id] for case_id in batch]
+        parent = case_wrappers[0].parent
+        if len(case_wrappers) > 1 and parent.runs_concurrently:
+            aio.run(parent._execute_cases_async(
+                aio.get_concurrency(), case_wrappers,
+                dispatch=self.track_event))
+            return
+
+        for case_wrapper in case_wrappers:
+            self.start_case(case_wrapper)
+            parent._call_hook('before_each')
+            case_wrapper.execute(parent._state)
+            parent._call_hook('after_each')
+            self.finish_case(case_wrapper)
+
+    def buffer_result(self, case_wrapper):
+        """ Results are pickled as they complete and flushed once enough of
+        them, or enough bytes, have built up or FLUSH_INTERVAL has passed.
+        Slow cases are therefore sent straight away while fast ones are
+        sent together.
+        """
+        result = CaseResult.from_wrapper(case_wrapper)
+        data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        self.buffered.append(data)
+        self.buffered_bytes += len(data)
+
+        if (len(self.buffered) >= self.FLUSH_COUNT or
+                self.buffered_bytes >= self.FLUSH_BYTES or
+                time() - self.last_flush >= self.FLUSH_INTERVAL):
+            self.flush_results()
+
+    def flush_results(self):
+        if self.buffered:
+            self.pipe.send(self.buffered)
+            self.buffered = []
+            self.buffered_bytes = 0
+        self.last_flush = time()
 
     def run(self):  # pragma: no cover
         """ Note: CI Coverage is turned off due to it not showing covered
         even with there being tests that run this function.
         """
-        last_time = time()
-        completed = []
+        self.buffered = []
+        self.buffered_bytes = 0
+        self.last_flush = 0
+        self.prepared_parents = {}
+        set_default_timeout(self.case_timeout)
+        aio.set_concurrency(self.async_concurrency)
+
+        if self.suite_locator:
+            self.all_cases, self.all_parents = self.suite_locator.locate()
 
         if self.coverage:
             self.coverage.start()
 
         while True:
             # Get item and get real function to execute
-            case_wrapper = self.work_queue.get()
-            if case_wrapper == 'STOP':
+            batch = self.work_queue.get()
+            if batch == 'STOP':
+                self.finish_parents()
+
                 # Make sure buffer is cleared
-                if len(completed) > 0:
-                    self.pipe.send(completed)
-                    self.completed = []
+                self.flush_results()
                 self.pipe.send(None)
 
                 if self.coverage:
@@ -46,88 +345,430 @@ class ExecuteTestProcess(mp.Process):
                     self.coverage.save()
                 return
 
-            case_wrapper.case_func = self.all_cases[case_wrapper.case_func]
-            case_wrapper.parent = self.all_parents[case_wrapper.parent]
-            case_wrapper.parent._state.before_each()
-            case_wrapper.execute(case_wrapper.parent._state)
-            case_wrapper.parent._state.after_each()
-            self.worked.value += 1
-            completed.append(case_wrapper)
+            # Published before anything runs so that the batch isn't lost
+            # if the worker dies before reporting any of it
+            self.current_batch.value = batch[0].encode()
+
+            # Batches only ever hold cases of a single describe
+            describe = None
+            self.describe_started.value = time()
+            if self.describe_affinity:
+                describe = self.start_describe(batch)
+                prepared = describe is not None
+            else:
+                prepared = self.prepare_parent(batch)
+            self.describe_started.value = 0.0
+            if not prepared:
+                continue
+
+            self.run_cases(batch)
 
-            # Flush completed buffer to queue
-            if completed and time() >= (last_time + 0.01):
-                self.pipe.send(completed)
-                completed = []
-                last_time = time()
+            # Flush at the end of every batch so that a worker killed
+            # during a later batch doesn't take finished results with it
+            self.flush_results()
+
+            if describe:
+                finish_describe(describe)
 
 
 class ParallelManager(object):
+    #: Upper bound on the number of cases sent to a worker at once
+    BATCH_SIZE = 50
+
+    #: Number of batches each process should see over a run. More batches
+    #: reduce the straggler tail at the cost of more queue round-trips.
+    BATCHES_PER_PROCESS = 4
+
+    #: Seconds a worker gets past a case's timeout before it's killed. This
+    #: lets the worker report the timeout itself whenever it still can.
+    KILL_GRACE = 1.0
+
+    #: Max number of seconds between checks on the health of the workers
+    SUPERVISE_INTERVAL = 0.1
+
+    #: Number of times in a row each worker may be replaced without any
+    #: case finishing before the rest of the run is given up on
+    MAX_IDLE_RESTARTS = 3
 
     def __init__(self, num_processes=6, track_coverage=False,
-                 coverage_omit=None):
+                 coverage_omit=None, duration_lookup=None,
+                 start_method=None, search_paths=None,
+                 coverage_data_file=None, record_contexts=False,
+                 case_timeout=None, describe_affinity=False,
+                 async_concurrency=aio.DEFAULT_CONCURRENCY):
         self.processes = []
         self.num_processes = num_processes
         self.stops_hit = 0
         self.thead_lock = threading.Lock()
-        self.work_queue = mp.Queue()
+        self.start_method = start_method
+        self.context = mp.get_context(start_method)
+        self.search_paths = search_paths or []
+        self.work_queue = self.context.Queue()
         self.active_pipes = []
-        self.case_functions = {}
+        self.case_wrappers = {}
         self.case_parents = {}
+        self.pending_cases = collections.OrderedDict()
         self.track_coverage = track_coverage
         self.coverage_omit = coverage_omit
+        self.coverage_data_file = coverage_data_file
+        self.record_contexts = record_contexts
+        self.duration_lookup = duration_lookup
+        self.case_timeout = case_timeout
+        self.describe_affinity = describe_affinity
+        self.async_concurrency = async_concurrency
+        self.worker_pipes = {}
+        self.worker_tables = (None, None, None)
+        self.case_batches = {}
+        self.completed_cases = set()
+        self.idle_restarts = 0
+        self.progress = 0
+        self.suites = []
+        self.registered_suites = set()
+        self.suite_occurrences = {}
+
+    def register_suite(self, suite):
+        """ Keeps track of the suites in the run, in the order their cases
+        were first queued, and numbers repeated instances of the same suite.
+        """
+        if suite not in self.registered_suites:
+            number_suite(suite, self.suite_occurrences)
+            self.registered_suites.add(suite)
+            self.suites.append(suite)
 
     def add_to_queue(self, case_wrapper):
-        self.work_queue.put(case_wrapper)
+        self.register_suite(case_wrapper.parent.top_parent)
+
+        # Cases are grouped by their parent and dispatched in batches
+        parent_cases = self.pending_cases.setdefault(
+            case_wrapper.parent.id, [])
+        parent_cases.append(case_wrapper)
 
         # Keep track of wrappers and parents
-        self.case_functions[case_wrapper.id] = case_wrapper.case_func
+        self.case_wrappers[case_wrapper.id] = case_wrapper
         self.case_parents[case_wrapper.parent.id] = case_wrapper.parent
 
-    def sync_wrappers(self, wrapper_list):
-        for wrapper in wrapper_list:
-            parent_id = wrapper.parent
-            wrapper_id = wrapper.case_func
-
-            parent = wrapper.parent = self.case_parents[parent_id]
-            wrapper.case_func = self.case_functions[wrapper_id]
-            wrapper.parent.cases[wrapper_id] = wrapper
-            wrapper.parent.top_parent.dispatch(TestEvent(wrapper))
-            parent._num_completed_cases += 1
-
-            while parent:
-                if parent.complete:
-                    evt = DescribeEvent(DescribeEvent.COMPLETE, parent)
-                    parent._state.after_all()
-                    parent.top_parent.dispatch(evt)
-                    parent = parent.parent
-                else:
-                    parent = None
+    def estimate_duration(self, case_wrapper):
+        """ Estimated run time of a case. Without any recorded history every
+        case is considered equal, so batches are balanced by case count.
+        """
+        duration = None
+        if self.duration_lookup:
+            duration = self.duration_lookup(case_wrapper)
+        return duration if duration is not None else 1.0
 
-    def sync_wrappers_from_pipes(self):
+    def build_batches(self):
+        """ Splits the pending cases into batches grouped by parent describe
+        and ordered longest-first. Under describe affinity, each describe's
+        cases are kept in a single batch. Batches of async cases hold at
+        least as many cases as may run at once.
+        """
+        estimates = {}
+        for cases in self.pending_cases.values():
+            for case in cases:
+                estimates[case.id] = self.estimate_duration(case)
+
+        num_batches = self.num_processes * self.BATCHES_PER_PROCESS
+        target_cost = sum(estimates.values()) / max(num_batches, 1)
+
+        batches = []
+        for cases in self.pending_cases.values():
+            # Async cases can only overlap with others in the same batch
+            min_size = 1
+            if all(case.is_async for case in cases):
+                min_size = self.async_concurrency
+
+            batch, cost = [], 0.0
+            for case in cases:
+                case_cost = estimates[case.id]
+                split = (cost + case_cost > target_cost or
+                         len(batch) >= self.BATCH_SIZE)
+                if (len(batch) >= min_size and split and
+                        not self.describe_affinity):
+                    batches.append((cost, batch))
+                    batch, cost = [], 0.0
+
+                batch.append(case)
+                cost += case_cost
+
+            if batch:
+                batches.append((cost, batch))
+
+        # Longest batches go first so that short ones fill in the tail
+        batches.sort(key=lambda item: item[0], reverse=True)
+        return [batch for cost, batch in batches]
+
+    @property
+    def inherits_state(self):
+        """ Only forked workers inherit the scanned suite and its state."""
+        return self.context.get_start_method() == 'fork'
+
+    def calls_hooks(self, describe):
+        """ Whether the coordinator calls the before_all and after_all of a
+        describe. Workers that rebuild the suite call them on their own, as
+        do workers running a pinned describe.
+        """
+        if not self.inherits_state:
+            return False
+        return not self.describe_affinity or not describe.cases
+
+    def create_suite_locator(self):
+        """ Prepares the import environment for workers that need to
+        rebuild the suite and returns the locator they'll use to do so.
+        """
+        locator = SuiteLocator([type(suite) for suite in self.suites])
+
+        # Spec modules are found through pike's import hooks, which aren't
+        # carried over to new interpreters.
+        for search_path in self.search_paths:
+            if search_path not in sys.path:
+                sys.path.append(search_path)
+
+        # Import the suite once in the fork server so that every worker
+        # forked from it starts with the spec modules already loaded.
+        if self.context.get_start_method() == 'forkserver':
+            self.context.set_forkserver_preload(
+                ['specter.spec', 'specter.expect'] + locator.module_names)
+        return locator
+
+    def schedule_pending(self):
+        # Workers can resolve cases by their id, so only ids are queued
+        for batch in self.build_batches():
+            self.queue_batch([case.id for case in batch])
+        self.pending_cases.clear()
+
+    def queue_batch(self, case_ids):
+        for case_id in case_ids:
+            self.case_batches[case_id] = case_ids
+        self.work_queue.put(case_ids)
+
+    def complete_case(self, wrapper):
+        parent = wrapper.parent
+        self.completed_cases.add(wrapper.id)
+        parent.top_parent.dispatch(TestEvent(wrapper))
+
+        for describe in parent._case_finished(wrapper):
+            evt = DescribeEvent(DescribeEvent.COMPLETE, describe)
+            if self.calls_hooks(describe):
+                describe._call_hook('after_all')
+            describe.top_parent.dispatch(evt)
+
+    def sync_results(self, results):
+        for result in results:
+            # A case may be re-run after its worker was replaced
+            if result.id in self.completed_cases:
+                continue
+
+            wrapper = self.case_wrappers[result.id]
+            result.apply_to(wrapper)
+            self.complete_case(wrapper)
+
+    def receive(self, pipe):
+        """ Syncs everything a worker has sent. Returns the number of stop
+        notifications received.
+        """
         stops = 0
-        while stops < self.num_processes:
-            for pipe in self.active_pipes:
-                if pipe.poll(0.01):
-                    received = pipe.recv()
-                    if received is None:
-                        stops += 1
-                    else:
-                        self.sync_wrappers(received)
-                    if stops >= self.num_processes:
-                        break
+        while pipe.poll(0):
+            try:
+                received = pipe.recv()
+            except (EOFError, OSError):
+                break
+
+            if received is None:
+                stops += 1
+            else:
+                self.sync_results([pickle.loads(data) for data in received])
+        return stops
+
+    def sync_wrappers_from_pipes(self):
+        stopped = set()
+        stopping = False
+        while True:
+            # Wake up on results or a worker exiting, but no later than
+            # the supervise interval so that timeouts are still enforced
+            waiting = {}
+            for test_process in self.processes:
+                if test_process not in stopped:
+                    waiting[self.worker_pipes[test_process]] = test_process
+                    waiting[test_process.sentinel] = test_process
+
+            for ready in wait(list(waiting), self.SUPERVISE_INTERVAL):
+                test_process = waiting[ready]
+                if ready is self.worker_pipes.get(test_process):
+                    if self.receive(ready):
+                        stopped.add(test_process)
+
+            # Workers are only stopped once every case has been reported,
+            # so replacement workers can pick up requeued cases.
+            if not stopping:
+                if len(self.completed_cases) >= len(self.case_wrappers):
+                    stopping = True
+                    for test_process in self.processes:
+                        self.work_queue.put('STOP')
+                else:
+                    self.supervise_workers()
+            elif self.all_stopped(stopped):
+                return
+
+    def all_stopped(self, stopped):
+        for test_process in self.processes:
+            if test_process in stopped:
+                continue
+
+            # All work is done, so a worker that died on the way out only
+            # needs to have its pipe drained.
+            if test_process.is_alive():
+                return False
+            if self.receive(self.worker_pipes[test_process]):
+                stopped.add(test_process)
+        return True
+
+    def get_case_timeout(self, case_id):
+        timeout = self.case_wrappers[case_id].timeout
+        return timeout if timeout is not None else self.case_timeout
+
+    def supervise_workers(self):
+        """ Replaces workers that have died or are stuck on a case, or on
+        the before_all of a describe, past its timeout.
+        """
+        now = time()
+        for test_process in list(self.processes):
+            if not test_process.is_alive():
+                error = WorkerCrashedException(test_process.exitcode)
+                self.replace_worker(test_process, error)
+                continue
+
+            in_flight = test_process.in_flight()
+            describe_started = test_process.describe_started.value
+            if describe_started:
+                # A before_all is bound by the timeout of its cases
+                batch_id = test_process.current_batch.value.decode()
+                in_flight[batch_id] = describe_started
+
+            for case_id, started in in_flight.items():
+                timeout = self.get_case_timeout(case_id)
+                if timeout and now - started > timeout + self.KILL_GRACE:
+                    error = TestTimeoutException(timeout)
+                    self.replace_worker(test_process, error, case_id)
+                    break
+
+    def replace_worker(self, test_process, error, case_id=None):
+        """ Removes a worker and records the error against the given case,
+        or against every case it was running if none is given. The error
+        is recorded against its whole batch if the before_all of its
+        describe was running. The unfinished rest of the batch is requeued.
+        """
+        if test_process.is_alive():
+            test_process.kill()
+        test_process.join()
+
+        # Keep whatever the worker managed to send before it went away
+        pipe = self.worker_pipes.pop(test_process)
+        self.receive(pipe)
+        pipe.close()
+        self.active_pipes.remove(pipe)
+        self.processes.remove(test_process)
+
+        batch_id = test_process.current_batch.value.decode()
+        in_flight = test_process.in_flight()
+        describe_started = test_process.describe_started.value
+
+        # Includes cases whose results were lost with the worker
+        remaining = []
+        if batch_id:
+            remaining = [batch_case
+                         for batch_case in self.case_batches[batch_id]
+                         if batch_case not in self.completed_cases]
+
+        if describe_started:
+            failed, remaining = remaining, []
+        else:
+            # There's no telling which of its running cases took a crashed
+            # worker down, so all of them are failed
+            suspects = [case_id] if case_id else list(in_flight)
+            failed = [failed_id for failed_id in suspects
+                      if failed_id in remaining]
+            remaining = [remaining_id for remaining_id in remaining
+                         if remaining_id not in failed]
+
+        case_wrappers = [self.case_wrappers[failed_id]
+                         for failed_id in failed]
+        try:
+            raise error
+        except Exception as e:
+            fail_cases(case_wrappers, e)
+
+        for case_wrapper in case_wrappers:
+            case_wrapper.start_time = (in_flight.get(case_wrapper.id) or
+                                       describe_started)
+            self.complete_case(case_wrapper)
+
+        if remaining:
+            self.queue_batch(remaining)
+
+        # Workers that die before finishing anything, e.g. because a spec
+        # module can't be imported, would otherwise be replaced forever
+        if len(self.completed_cases) > self.progress:
+            self.progress = len(self.completed_cases)
+            self.idle_restarts = 0
+        else:
+            self.idle_restarts += 1
+
+        if self.idle_restarts > self.MAX_IDLE_RESTARTS * self.num_processes:
+            self.abandon_cases(error)
+        elif len(self.completed_cases) < len(self.case_wrappers):
+            self.start_worker()
+
+    def abandon_cases(self, error):
+        """ Records the error against every case that hasn't finished. """
+        while True:
+            try:
+                self.work_queue.get_nowait()
+            except queue.Empty:
+                break
+
+        case_wrappers = [self.case_wrappers[case_id]
+                         for case_id in self.case_wrappers
+                         if case_id not in self.completed_cases]
+        try:
+            raise error
+        except Exception as e:
+            fail_cases(case_wrappers, e)
+
+        for case_wrapper in case_wrappers:
+            self.complete_case(case_wrapper)
+
+    def start_worker(self):
+        all_cases, all_parents, suite_locator = self.worker_tables
+        parent_pipe, child_pipe = self.context.Pipe(duplex=False)
+        test_process = ExecuteTestProcess(
+            self.work_queue, all_cases, all_parents, child_pipe,
+            track_coverage=self.track_coverage,
+            coverage_omit=self.coverage_omit,
+            start_method=self.start_method,
+            suite_locator=suite_locator,
+            coverage_data_file=self.coverage_data_file,
+            record_contexts=self.record_contexts,
+            case_timeout=self.case_timeout,
+            describe_affinity=self.describe_affinity,
+            async_concurrency=self.async_concurrency)
+        self.active_pipes.append(parent_pipe)
+        self.worker_pipes[test_process] = parent_pipe
+        self.processes.append(test_process)
+        test_process.start()
+        return test_process
 
     def execute_all(self):
+        all_cases, all_parents = self.case_wrappers, self.case_parents
+        suite_locator = None
+        if not self.inherits_state:
+            all_cases, all_parents = None, None
+            suite_locator = self.create_suite_locator()
+        self.worker_tables = (all_cases, all_parents, suite_locator)
+
+        self.schedule_pending()
+
         for i in range(0, self.num_processes):
-            parent_pipe, child_pipe = mp.Pipe(duplex=False)
-            test_process = ExecuteTestProcess(
-                self.work_queue, self.case_functions,
-                self.case_parents, child_pipe,
-                track_coverage=self.track_coverage,
-                coverage_omit=self.coverage_omit)
-            self.active_pipes.append(parent_pipe)
-            self.processes.append(test_process)
-            self.work_queue.put('STOP')
-            test_process.start()
+            self.start_worker()
 
         self.sync_wrappers_from_pipes()
 
@@ -140,3 +781,121 @@ class ParallelManager(object):
 
         for pipe in self.active_pipes:
             pipe.close()
+
+
+class ThreadManager(object):
+    """ Runs describes concurrently on a pool of threads.
+
+    Each describe runs its before_all and cases as a single job, so its
+    state object is only ever used by one thread at a time. Child describes
+    are started once their parent's cases have finished and the parent's
+    after_all runs once all of its children are done. Events are dispatched
+    from the calling thread in the same order as a serial run.
+    """
+
+    def __init__(self, num_threads=4):
+        self.num_threads = num_threads
+        self.pool = None
+        self.describes = []
+        self.children = {}
+        self.pending_children = {}
+        self.cases_done = {}
+        self.finished = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def add_describe(self, describe):
+        self.children[describe] = []
+        self.cases_done[describe] = threading.Event()
+        self.finished[describe] = threading.Event()
+
+        if describe.parent in self.children:
+            self.children[describe.parent].append(describe)
+        else:
+            self.describes.append(describe)
+
+    def submit(self, func, describe):
+        if not self.errors:
+            self.pool.submit(func, describe)
+
+    def fail(self, describe, error):
+        self.errors[describe] = error
+        self.cases_done[describe].set()
+        self.finished[describe].set()
+
+    def run_cases(self, describe):
+        try:
+            describe._call_hook('before_all')
+            if describe.runs_concurrently:
+                # Events are dispatched by report() on the calling thread
+                aio.run(describe._execute_cases_async(
+                    aio.get_concurrency(), dispatch=ignore_event))
+            else:
+                for key, case in describe.cases.items():
+                    describe._execute_case(case)
+        except Exception as e:
+            self.fail(describe, e)
+            return
+        self.cases_done[describe].set()
+
+        children = self.children[describe]
+        self.pending_children[describe] = len(children)
+        if not children:
+            self.submit(self.run_after_all, describe)
+
+        for child in children:
+            self.submit(self.run_cases, child)
+
+    def run_after_all(self, describe):
+        try:
+            describe._call_hook('after_all')
+        except Exception as e:
+            self.fail(describe, e)
+            return
+        self.finished[describe].set()
+
+        parent = describe.parent
+        if parent not in self.children:
+            return
+
+        with self.lock:
+            self.pending_children[parent] -= 1
+            parent_done = self.pending_children[parent] == 0
+
+        if parent_done:
+            self.submit(self.run_after_all, parent)
+
+    def wait_for(self, events, describe):
+        # Jobs are no longer submitted once anything fails, so stop waiting
+        # as soon as an error is raised anywhere in the run
+        while not events[describe].wait(0.01):
+            if self.errors:
+                break
+
+        if self.errors:
+            raise self.errors.get(describe) or list(self.errors.values())[0]
+
+    def report(self, describe):
+        top_parent = describe.top_parent
+
+        self.wait_for(self.cases_done, describe)
+        top_parent.dispatch(DescribeEvent(DescribeEvent.START, describe))
+        for key, case in describe.cases.items():
+            top_parent.dispatch(TestEvent(case, TestEvent.START))
+            top_parent.dispatch(TestEvent(case))
+
+        for child in self.children[describe]:
+            self.report(child)
+
+        self.wait_for(self.finished, describe)
+        top_parent.dispatch(DescribeEvent(DescribeEvent.COMPLETE, describe))
+
+    def execute_all(self):
+        with ThreadPoolExecutor(max_workers=self.num_threads) as pool:
+            self.pool = pool
+            for describe in self.describes:
+                self.submit(self.run_cases, describe)
+
+            for describe in self.describes:
+                self.report(describe)
+        self.pool = None
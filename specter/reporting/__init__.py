@@ -56,7 +56,9 @@ class ReporterPluginManager(object):
         [reporter.add_arguments(argparser) for reporter in self.reporters]
 
     def process_arguments(self, args):
-        self.parallel = args.parallel
+        # Distributed runs report out of order just like parallel ones
+        self.parallel = (args.parallel or
+                         bool(getattr(args, 'serve_work', None)))
         [reporter.process_arguments(args) for reporter in self.reporters]
 
     def can_use_reporter(self, reporter, parallel):
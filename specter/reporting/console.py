@@ -1,4 +1,5 @@
 from specter import _
+from specter.results import ResultSummary
 from specter.spec import TestEvent, DescribeEvent
 from specter.reporting import AbstractConsoleReporter, AbstractSerialReporter
 from specter.reporting.utils import (
@@ -16,13 +17,7 @@ class ConsoleReporter(AbstractConsoleReporter, AbstractSerialReporter):
         super(ConsoleReporter, self).__init__()
         self.use_color = use_color
         self.use_unicode = True
-        self.test_total = 0
-        self.test_expects = 0
-        self.passed_tests = 0
-        self.skipped_tests = 0
-        self.errored_tests = 0
-        self.failed_tests = 0
-        self.incomplete_tests = 0
+        self.specs = []
         self.output_docstrings = output_docstrings
         self.show_all = False
         self.separator = UNICODE_SEP
@@ -67,21 +62,37 @@ class ConsoleReporter(AbstractConsoleReporter, AbstractSerialReporter):
 
         return status, name
 
-    def add_to_totals(self, test_case):
-        self.test_total += 1
-        if (test_case.success and
-                not test_case.skipped and
-                not test_case.incomplete):
-            self.passed_tests += 1
-        elif test_case.skipped:
-            self.skipped_tests += 1
-        elif test_case.incomplete:
-            self.incomplete_tests += 1
-        elif test_case.error:
-            self.errored_tests += 1
-        else:
-            self.failed_tests += 1
-        self.test_expects += len(test_case.expects)
+    @property
+    def summary(self):
+        return ResultSummary.combine(spec.summary for spec in self.specs)
+
+    @property
+    def test_total(self):
+        return self.summary.total
+
+    @property
+    def test_expects(self):
+        return self.summary.expects
+
+    @property
+    def passed_tests(self):
+        return self.summary.passed
+
+    @property
+    def skipped_tests(self):
+        return self.summary.skipped
+
+    @property
+    def errored_tests(self):
+        return self.summary.errored
+
+    @property
+    def failed_tests(self):
+        return self.summary.failed
+
+    @property
+    def incomplete_tests(self):
+        return self.summary.incomplete
 
     def output_test_case_result(self, test_case, level):
         name = test_case.pretty_name
@@ -111,6 +122,7 @@ class ConsoleReporter(AbstractConsoleReporter, AbstractSerialReporter):
             )
 
     def subscribe_to_spec(self, spec):
+        self.specs.append(spec)
         spec.add_listener(TestEvent.COMPLETE, self.test_complete)
         spec.add_listener(DescribeEvent.START, self.start_spec)
 
@@ -120,8 +132,6 @@ class ConsoleReporter(AbstractConsoleReporter, AbstractSerialReporter):
 
         self.output_test_case_result(test_case, level)
 
-        self.add_to_totals(test_case)
-
     def start_spec(self, evt):
         level = get_item_level(evt.payload)
         name = evt.payload.name
@@ -144,6 +154,7 @@ class ConsoleReporter(AbstractConsoleReporter, AbstractSerialReporter):
         print_indent_msg(msg, indent, color)
 
     def print_summary(self):
+        summary = self.summary
         msg = """------- Summary --------
 Pass            | {passed}
 Skip            | {skipped}
@@ -153,14 +164,12 @@ Incomplete      | {incomplete}
 Test Total      | {total}
  - Expectations | {expects}
 """.format(
-            total=self.test_total, passed=self.passed_tests,
-            failed=self.failed_tests, expects=self.test_expects,
-            skipped=self.skipped_tests, incomplete=self.incomplete_tests,
-            errored=self.errored_tests)
+            total=summary.total, passed=summary.passed,
+            failed=summary.failed, expects=summary.expects,
+            skipped=summary.skipped, incomplete=summary.incomplete,
+            errored=summary.errored)
 
-        status = TestStatus.FAIL
-        if self.failed_tests == 0 and self.errored_tests == 0:
-            status = TestStatus.PASS
+        status = TestStatus.PASS if summary.success else TestStatus.FAIL
 
         print_to_screen('\n')
         self.output('-' * 24, 0, status)
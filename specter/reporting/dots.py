@@ -1,6 +1,7 @@
 from sys import stdout
 
 from specter import _
+from specter.results import ResultSummary
 from specter.spec import TestEvent
 from specter.reporting import AbstractConsoleReporter
 from specter.reporting import AbstractParallelReporter
@@ -12,7 +13,7 @@ class DotsReporter(AbstractConsoleReporter, AbstractParallelReporter):
 
     def __init__(self):
         super(DotsReporter, self).__init__()
-        self.total = 0
+        self.specs = []
         self.failed_tests = []
         self.use_color = True
 
@@ -20,6 +21,7 @@ class DotsReporter(AbstractConsoleReporter, AbstractParallelReporter):
         return _('Dots Reporter')
 
     def subscribe_to_spec(self, spec):
+        self.specs.append(spec)
         spec.add_listener(TestEvent.COMPLETE, self.test_event)
 
     def process_arguments(self, args):
@@ -52,8 +54,11 @@ class DotsReporter(AbstractConsoleReporter, AbstractParallelReporter):
 
         print_expects(wrapper, level, use_color=self.use_color)
 
+    @property
+    def total(self):
+        return ResultSummary.combine(spec.summary for spec in self.specs).total
+
     def test_event(self, evt):
-        self.total += 1
         if evt.payload.success:
             char = '.'
         else:
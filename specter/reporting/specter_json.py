@@ -1,38 +1,102 @@
+import argparse
 import json
+import sys
+from time import time
 
 from specter import _
-from specter.spec import DescribeEvent
+from specter.spec import DescribeEvent, TestEvent
 from specter.reporting import AbstractParallelReporter, AbstractSerialReporter
 
+FORMAT_VERSION = '0.1.0'
+
 
 class SpecterJsonReporter(AbstractSerialReporter, AbstractParallelReporter):
     """ A Specter JSON format report generator for the Specter framework. """
 
+    #: Number of buffered records before the stream is flushed
+    FLUSH_RECORDS = 500
+
+    #: Max number of seconds between flushes of the stream
+    FLUSH_INTERVAL = 1.0
+
     def __init__(self):
         self.top_most_specs = []
         self.filename = ''
+        self.stream_filename = ''
+        self.stream = None
+        self.unflushed = 0
+        self.last_flush = 0
 
     def add_arguments(self, argparser):
         argparser.add_argument(
             '--json-results', dest='json_results', metavar='',
             help=_('Saves Specter JSON results into a specifed file'))
+        argparser.add_argument(
+            '--json-stream-results', dest='json_stream_results', metavar='',
+            help=_('Streams Specter results as JSON Lines into a specified '
+                   'file while the tests run'))
 
     def process_arguments(self, args):
         if args.json_results:
             self.filename = args.json_results
+        if getattr(args, 'json_stream_results', None):
+            self.stream_filename = args.json_stream_results
 
     def get_name(self):
         return 'Specter JSON report generator'
 
     def subscribe_to_spec(self, spec):
         spec.add_listener(DescribeEvent.COMPLETE, self.spec_complete)
+        if self.stream_filename:
+            spec.add_listener(DescribeEvent.START, self.spec_start)
+            spec.add_listener(TestEvent.COMPLETE, self.test_complete)
+
+    def spec_start(self, evt):
+        spec = evt.payload
+        parent = spec.parent
+        self.write_record({
+            'type': 'spec',
+            'id': spec.id,
+            'parent_id': parent.id if parent else None,
+            'name': spec.name,
+            'class_path': spec.real_class_path,
+            'doc': spec.doc
+        })
 
     def spec_complete(self, evt):
         spec = evt.payload
-        if not spec.parent:
+        if self.filename and not spec.parent:
             self.top_most_specs.append(spec)
 
+    def test_complete(self, evt):
+        case = evt.payload
+        record = case.serialize()
+        record['type'] = 'case'
+        record['spec_id'] = case.parent.id
+        self.write_record(record)
+
+    def write_record(self, record):
+        if not self.stream:
+            self.stream = open(self.stream_filename, 'w',
+                               buffering=1024 * 64)
+            self.last_flush = time()
+
+        self.stream.write(json.dumps(record))
+        self.stream.write('\n')
+        self.unflushed += 1
+
+        now = time()
+        if (self.unflushed >= self.FLUSH_RECORDS or
+                now - self.last_flush >= self.FLUSH_INTERVAL):
+            self.stream.flush()
+            self.unflushed = 0
+            self.last_flush = now
+
     def finished(self, fp=None):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
         if not self.filename:
             return
 
@@ -42,7 +106,7 @@ class SpecterJsonReporter(AbstractSerialReporter, AbstractParallelReporter):
 
         output = {
             'format': 'specter',
-            'version': '0.1.0',
+            'version': FORMAT_VERSION,
             'specs': serialized_specs
         }
 
@@ -52,3 +116,62 @@ class SpecterJsonReporter(AbstractSerialReporter, AbstractParallelReporter):
 
         json.dump(output, fp)
         fp.close()
+
+
+def assemble_json_lines(lines):
+    """ Reassembles streamed JSON Lines records into the nested Specter
+    JSON format.
+    """
+    specs = {}
+    cases = {}
+    order = []
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        record = json.loads(line)
+        record_type = record.pop('type')
+        if record_type == 'case':
+            cases.setdefault(record.pop('spec_id'), []).append(record)
+        elif record_type == 'spec':
+            specs[record['id']] = record
+            order.append(record['id'])
+
+    top_most_specs = []
+    for spec_id in order:
+        spec = specs[spec_id]
+        spec['cases'] = cases.get(spec_id, [])
+        spec.setdefault('specs', [])
+
+        parent_id = spec.pop('parent_id')
+        if parent_id in specs:
+            specs[parent_id].setdefault('specs', []).append(spec)
+        else:
+            top_most_specs.append(spec)
+
+    return {
+        'format': 'specter',
+        'version': FORMAT_VERSION,
+        'specs': top_most_specs
+    }
+
+
+def main(args=None):  # pragma: no cover
+    parser = argparse.ArgumentParser(
+        description=_('Converts streamed Specter JSON Lines results into '
+                      'the Specter JSON format.'))
+    parser.add_argument('input', help=_('JSON Lines results file'))
+    parser.add_argument('output', help=_('Specter JSON output file'))
+    arguments = parser.parse_args(args)
+
+    with open(arguments.input) as handle:
+        output = assemble_json_lines(handle)
+
+    with open(arguments.output, 'w') as handle:
+        json.dump(output, handle)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main(sys.argv[1:])
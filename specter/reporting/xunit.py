@@ -6,12 +6,17 @@ from specter.reporting import AbstractParallelReporter, AbstractSerialReporter
 
 
 class XUnitReporter(AbstractSerialReporter, AbstractParallelReporter):
-    """ A simple xUnit format report generator for the Specter framework. """
-    # TODO: Make this more efficient!
+    """ A simple xUnit format report generator for the Specter framework.
+
+    Once a filename is known, each suite is written to disk as soon as its
+    describe completes so memory use doesn't grow with the size of the run.
+    """
+    XML_HEADER = "<?xml version='1.0' encoding='utf8'?>\n"
 
     def __init__(self):
         self.suites = []
         self.filename = ''
+        self.stream = None
 
     def add_arguments(self, argparser):
         argparser.add_argument(
@@ -33,7 +38,27 @@ class XUnitReporter(AbstractSerialReporter, AbstractParallelReporter):
 
         suite = XUnitTestSuite()
         suite.assign_describe(describe)
-        self.suites.append(suite)
+
+        if self.filename:
+            self.write_suite(suite)
+        else:
+            self.suites.append(suite)
+
+    def open_stream(self):
+        self.stream = open(self.filename, 'w', encoding='utf8',
+                           buffering=1024 * 64)
+        self.stream.write(self.XML_HEADER)
+        self.stream.write('<testsuites>')
+
+        # Flush anything collected before the filename was known
+        suites, self.suites = self.suites, []
+        for suite in suites:
+            self.write_suite(suite)
+
+    def write_suite(self, suite):
+        if not self.stream:
+            self.open_stream()
+        self.stream.write(suite.to_str())
 
     def convert_to_xml(self):
         test_suites = Element('testsuites')
@@ -47,24 +72,37 @@ class XUnitReporter(AbstractSerialReporter, AbstractParallelReporter):
         if not self.filename:
             return
 
-        body = element_to_str(self.convert_to_xml(), encoding='utf8')
+        if not self.stream:
+            self.open_stream()
 
-        handle = open(self.filename, 'w')
-        handle.write(body.decode('utf8'))
-        handle.close()
+        self.stream.write('</testsuites>')
+        self.stream.close()
+        self.stream = None
 
 
 class XUnitTestSuite(object):
     def __init__(self):
         self.describe = None
         self.tests = []
+        self.num_errors = 0
+        self.num_failures = 0
+        self.num_skipped = 0
 
     def assign_describe(self, describe):
         self.describe = describe
         for key, case in self.describe.cases.items():
             test_case = XUnitTestCase()
             test_case.assign_case_wrapper(case)
-            self.tests.append(test_case)
+            self.add_test(test_case)
+
+    def add_test(self, test_case):
+        self.tests.append(test_case)
+        if test_case.error:
+            self.num_errors += 1
+        if not test_case.success:
+            self.num_failures += 1
+        if test_case.skipped:
+            self.num_skipped += 1
 
     @property
     def name(self):
@@ -76,15 +114,15 @@ class XUnitTestSuite(object):
 
     @property
     def errors(self):
-        return str(len([test for test in self.tests if test.error]))
+        return str(self.num_errors)
 
     @property
     def failures(self):
-        return str(len([test for test in self.tests if not test.success]))
+        return str(self.num_failures)
 
     @property
     def skipped(self):
-        return str(len([test for test in self.tests if test.skipped]))
+        return str(self.num_skipped)
 
     def convert_to_xml(self):
         element = Element('testsuite', {'name': self.name,
@@ -97,6 +135,9 @@ class XUnitTestSuite(object):
             element.append(test.convert_to_xml())
         return element
 
+    def to_str(self):
+        return element_to_str(self.convert_to_xml(), encoding='unicode')
+
     def __str__(self):
         return element_to_str(self.convert_to_xml(), encoding='utf8')
 
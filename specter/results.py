@@ -0,0 +1,237 @@
+import reprlib
+
+from specter import _
+from specter.util import resolve_expect_params
+
+_short_repr = reprlib.Repr()
+_short_repr.maxstring = _short_repr.maxother = 80
+
+
+def render(value, short=False):
+    """ Converts a value to the string shown in reports. Short renders are
+    bounded in size and are used where the value is only a fallback.
+    """
+    try:
+        if not short:
+            return str(value)
+        if isinstance(value, str):
+            return _short_repr.repr(value)[1:-1]
+        return _short_repr.repr(value)
+    except Exception:
+        return _('ERROR - Couldn\'t evaluate value')
+
+
+class ExpectRecord(object):
+    """ Compact, picklable record of a finished expectation.
+
+    Targets and expected values are rendered to strings up front, while
+    source parameters are resolved lazily from the recorded location just
+    like they are for an ExpectAssert. Values of passing expectations are
+    only shown when their source can't be found, so they're kept short.
+    """
+    __slots__ = ('success', 'required', 'actions', 'target', 'expected',
+                 'custom_msg', 'custom_report_vars', 'src_location',
+                 '_target_param', '_expected_param')
+
+    def __init__(self, success, required, actions, target, expected,
+                 custom_msg=None, custom_report_vars=None,
+                 src_location=None, target_param=None, expected_param=None):
+        self.success = success
+        self.required = required
+        self.actions = actions
+        self.target = target
+        self.expected = expected
+        self.custom_msg = custom_msg
+        self.custom_report_vars = custom_report_vars or {}
+        self.src_location = src_location
+        self._target_param = target_param
+        self._expected_param = expected_param
+
+    @classmethod
+    def from_expect(cls, expect):
+        if isinstance(expect, cls):
+            return expect
+
+        target_param, expected_param = None, None
+
+        # Keep parameters that were already resolved by the expect
+        src_location = expect.src_location
+        if not src_location:
+            target_param = expect.target_src_param
+            expected_param = expect.expected_src_param
+
+        short = expect.success
+        report_vars = expect.custom_report_vars
+        report_vars = dict((name, render(value, short))
+                           for name, value in report_vars.items())
+
+        return cls(
+            success=expect.success,
+            required=expect.required,
+            actions=[render(action, short)
+                     for action in expect.actions[1:-1]],
+            target=render(expect.target, short),
+            expected=render(getattr(expect, 'expected', None), short),
+            custom_msg=expect.custom_msg,
+            custom_report_vars=report_vars,
+            src_location=src_location,
+            target_param=target_param,
+            expected_param=expected_param
+        )
+
+    def _resolve_src_params(self):
+        if self.src_location:
+            params = resolve_expect_params(self.src_location)
+            self.src_location = None
+            if params:
+                self._target_param = params.expect_arg
+                self._expected_param = params.cmp_arg
+
+    @property
+    def target_src_param(self):
+        self._resolve_src_params()
+        return self._target_param or None
+
+    @property
+    def expected_src_param(self):
+        self._resolve_src_params()
+        return self._expected_param or None
+
+    def serialize(self):
+        return {
+            'success': self.success,
+            'assertion': str(self),
+            'required': self.required
+        }
+
+    def __str__(self):
+        # The target and expected value surround the recorded actions
+        action_list = [self.target_src_param or self.target]
+        action_list.extend(self.actions)
+        action_list.append(self.expected_src_param or self.expected)
+
+        return ' '.join(action_list)
+
+    def to_dict(self):
+        return dict((name.lstrip('_'), getattr(self, name))
+                    for name in self.__slots__)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class CaseResult(object):
+    """ Outcome of a case executed in a worker, sent back in place of the
+    whole CaseWrapper.
+    """
+    __slots__ = ('id', 'start_time', 'end_time', 'failed', 'error',
+                 'skipped', 'incomplete', 'skip_reason', 'expects')
+
+    def __init__(self, id, start_time, end_time, failed=None, error=None,
+                 skipped=False, incomplete=False, skip_reason=None,
+                 expects=None):
+        self.id = id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.failed = failed
+        self.error = error
+        self.skipped = skipped
+        self.incomplete = incomplete
+        self.skip_reason = skip_reason
+        self.expects = expects or []
+
+    @classmethod
+    def from_wrapper(cls, wrapper):
+        return cls(
+            id=wrapper.id,
+            start_time=wrapper.start_time,
+            end_time=wrapper.end_time,
+            failed=wrapper.failed,
+            error=wrapper.error,
+            skipped=wrapper.skipped,
+            incomplete=wrapper.incomplete,
+            skip_reason=wrapper.skip_reason,
+            expects=[ExpectRecord.from_expect(expect)
+                     for expect in wrapper.expects]
+        )
+
+    def to_dict(self):
+        """ JSON-compatible form used by distributed workers. """
+        data = dict((name, getattr(self, name)) for name in self.__slots__)
+        data['expects'] = [expect.to_dict() for expect in self.expects]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        data['expects'] = [ExpectRecord.from_dict(expect)
+                           for expect in data.get('expects') or []]
+        return cls(**data)
+
+    def apply_to(self, wrapper):
+        """ Updates the coordinator's wrapper with the outcome. """
+        wrapper.start_time = self.start_time
+        wrapper.end_time = self.end_time
+        wrapper.failed = self.failed
+        wrapper.error = self.error
+        wrapper.skipped = self.skipped
+        wrapper.incomplete = self.incomplete
+        wrapper.skip_reason = self.skip_reason
+        wrapper.expects = self.expects
+
+
+class ResultSummary(object):
+    """ Running totals of finished cases.
+
+    Each describe keeps one for itself and everything below it, so totals
+    can be read without walking the tree. Summaries of separate suites are
+    added together with combine().
+    """
+    __slots__ = ('total', 'passed', 'failed', 'errored', 'skipped',
+                 'incomplete', 'expects', 'time')
+
+    def __init__(self):
+        self.total = 0
+        self.passed = 0
+        self.failed = 0
+        self.errored = 0
+        self.skipped = 0
+        self.incomplete = 0
+        self.expects = 0
+        self.time = 0.0
+
+    @staticmethod
+    def status_of(case):
+        """ Returns the name of the counter a case is totalled under. """
+        if case.success and not case.skipped and not case.incomplete:
+            return 'passed'
+        elif case.skipped:
+            return 'skipped'
+        elif case.incomplete:
+            return 'incomplete'
+        elif case.error:
+            return 'errored'
+        return 'failed'
+
+    @property
+    def success(self):
+        return self.failed == 0 and self.errored == 0
+
+    def add_case(self, case):
+        status = self.status_of(case)
+        setattr(self, status, getattr(self, status) + 1)
+        self.total += 1
+        self.expects += len(case.expects)
+        self.time += case.elapsed_time
+
+    def add(self, other):
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    @classmethod
+    def combine(cls, summaries):
+        combined = cls()
+        for summary in summaries:
+            combined.add(summary)
+        return combined
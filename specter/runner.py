@@ -1,11 +1,36 @@
+import multiprocessing as mp
+import os
 import sys
-from argparse import ArgumentParser
+from argparse import ArgumentParser, ArgumentTypeError
 
 import coverage
-from specter import _
+from specter import _, aio
+from specter.distributed import (DistributedManager, DistributedWorker,
+                                 parse_address)
+from specter.history import DEFAULT_CACHE_DIR, DurationHistory
+from specter.impact import ImpactMap
+from specter.index import SuiteIndex, parse_expression
 from specter.scanner import SuiteScanner
+from specter.sharding import select_shard
 from specter.reporting import ReporterPluginManager
-from specter.parallel import ParallelManager
+from specter.parallel import ParallelManager, SuiteLocator, ThreadManager
+from specter.spec import DescribeEvent, TestEvent, set_default_timeout
+
+
+def address_arg(value):
+    try:
+        return parse_address(value)
+    except ValueError:
+        raise ArgumentTypeError(
+            _('invalid address: {0} (expected HOST:PORT)').format(value))
+
+
+def expression_arg(value):
+    try:
+        return parse_expression(value)
+    except ValueError as e:
+        raise ArgumentTypeError(
+            _('invalid expression: {0} ({1})').format(value, e))
 
 
 class SpecterRunner(object):
@@ -21,6 +46,11 @@ class SpecterRunner(object):
         self.suites = []
         self.reporter_manager = None
         self.parallel_manager = None
+        self.thread_manager = None
+        self.duration_history = None
+        self.shard_history = None
+        self.impact_map = None
+        self.case_ids = set()
 
     def setup_argparse(self):
         self.arg_parser.add_argument(
@@ -66,6 +96,16 @@ class SpecterRunner(object):
             default=[],
             nargs='*'
         )
+        self.arg_parser.add_argument(
+            '--select-by-expression',
+            dest='select_expression',
+            metavar='',
+            help=_('Selects tests to run with a metadata expression using '
+                   'and, or, not and parentheses. A bare key matches tests '
+                   'that have it. Ex: "test=smoke and not slow"'),
+            type=expression_arg,
+            default=None
+        )
         self.arg_parser.add_argument(
             '--no-color',
             dest='no_color',
@@ -87,6 +127,115 @@ class SpecterRunner(object):
             help=_('Specifies the number of processes to use under '
                    'parallel mode (default: 6)')
         )
+        self.arg_parser.add_argument(
+            '--threads',
+            dest='num_threads',
+            type=int,
+            default=0,
+            metavar='',
+            help=_('Runs independent describes concurrently on the specified '
+                   'number of threads')
+        )
+        self.arg_parser.add_argument(
+            '--case-timeout',
+            dest='case_timeout',
+            type=float,
+            default=None,
+            metavar='',
+            help=_('Default number of seconds a test may run for before it '
+                   'is stopped and reported as an error')
+        )
+        self.arg_parser.add_argument(
+            '--async-concurrency',
+            dest='async_concurrency',
+            type=int,
+            default=aio.DEFAULT_CONCURRENCY,
+            metavar='',
+            help=_('Number of async tests within a Spec/Describe allowed to '
+                   'run at once (default: {0})').format(
+                       aio.DEFAULT_CONCURRENCY)
+        )
+        self.arg_parser.add_argument(
+            '--shard-index',
+            dest='shard_index',
+            type=int,
+            default=None,
+            metavar='',
+            help=_('Index (starting at 0) of the shard of tests to run. '
+                   'Requires --shard-count')
+        )
+        self.arg_parser.add_argument(
+            '--shard-count',
+            dest='shard_count',
+            type=int,
+            default=None,
+            metavar='',
+            help=_('Number of shards the tests are split into, balanced by '
+                   'the number of tests unless --shard-history is given')
+        )
+        self.arg_parser.add_argument(
+            '--shard-history',
+            dest='shard_history',
+            default=None,
+            metavar='',
+            help=_('Durations file (e.g. .specter_cache/durations.json from '
+                   'a previous build) used to balance the shards. Every '
+                   'shard has to be given the same file')
+        )
+        self.arg_parser.add_argument(
+            '--serve-work',
+            dest='serve_work',
+            type=address_arg,
+            default=None,
+            metavar='HOST:PORT',
+            help=_('Hands tests out to workers connecting to the given '
+                   'address and reports their results')
+        )
+        self.arg_parser.add_argument(
+            '--worker',
+            dest='worker',
+            type=address_arg,
+            default=None,
+            metavar='HOST:PORT',
+            help=_('Runs tests handed out by the coordinator at the given '
+                   'address')
+        )
+        self.arg_parser.add_argument(
+            '--describe-affinity',
+            dest='describe_affinity',
+            action='store_true',
+            help=_('Runs all tests of a Spec/Describe on the same worker, '
+                   'which calls its before_all and after_all')
+        )
+        self.arg_parser.add_argument(
+            '--start-method',
+            dest='start_method',
+            choices=mp.get_all_start_methods(),
+            default=None,
+            help=_('Multiprocessing start method used to create workers '
+                   'under parallel mode (default: platform default)')
+        )
+        self.arg_parser.add_argument(
+            '--changed-only',
+            dest='changed_only',
+            action='store_true',
+            help=_('Only runs tests affected by files changed since they '
+                   'were last recorded (requires the run history cache)')
+        )
+        self.arg_parser.add_argument(
+            '--cache-dir',
+            dest='cache_dir',
+            default=DEFAULT_CACHE_DIR,
+            metavar='',
+            help=_('Directory used to store run history such as test '
+                   'durations (default: {0})').format(DEFAULT_CACHE_DIR)
+        )
+        self.arg_parser.add_argument(
+            '--no-cache',
+            dest='no_cache',
+            action='store_true',
+            help=_('Disables reading and writing of the run history cache')
+        )
 
     def generate_ascii_art(self):
         tag_line = _('Keeping the Bogeyman away from your code!')
@@ -105,24 +254,153 @@ class SpecterRunner(object):
         omit_list = ['*/pyevents/event.py',
                      '*/pyevents/manager.py',
                      '*/specter/spec.py',
+                     '*/specter/aio.py',
+                     '*/specter/distributed.py',
                      '*/specter/expect.py',
+                     '*/specter/history.py',
+                     '*/specter/impact.py',
                      '*/specter/parallel.py',
+                     '*/specter/results.py',
                      '*/specter/scanner.py',
+                     '*/specter/sharding.py',
                      '*/specter/runner.py',
                      '*/specter/util.py',
                      '*/specter/reporting/__init__.py',
                      '*/specter/reporting/console.py',
                      '*/specter/reporting/dots.py',
+                     '*/specter/reporting/specter_json.py',
+                     '*/specter/reporting/utils.py',
                      '*/specter/reporting/xunit.py',
                      '*/specter/__init__.py']
         return omit_list
 
+    def get_duration_lookup(self):
+        if self.duration_history:
+            return self.duration_history.get
+
+    def get_shard_duration_lookup(self):
+        """ Shards are only balanced by durations every shard is given.
+        The local history is rewritten by each shard run, so it isn't used.
+        """
+        if self.shard_history:
+            return self.shard_history.get
+
+    def get_coverage_data_file(self):
+        """ Coverage used only for --changed-only is kept in the cache."""
+        if self.impact_map and not self.arguments.coverage:
+            return self.impact_map.coverage_file
+
+    def create_coverage(self, omit, parallel):
+        kwargs = {}
+        data_file = self.get_coverage_data_file()
+        if data_file:
+            kwargs['data_file'] = data_file
+        return coverage.coverage(omit=omit, data_suffix=parallel, **kwargs)
+
     def combine_coverage_reports(self, omit, parallel):
         """ Method to force the combination of parallel coverage reports."""
-        tmp_cov = coverage.coverage(omit=omit, data_suffix=parallel)
+        tmp_cov = self.create_coverage(omit, parallel)
         tmp_cov.load()
         tmp_cov.combine()
         tmp_cov.save()
+        return tmp_cov
+
+    def switch_coverage_context(self, evt):
+        self.coverage.switch_context(evt.payload.id)
+
+    def get_changed_case_ids(self, index):
+        """ Returns the ids of the cases affected by changed files or None
+        when there isn't any recorded history to select from.
+        """
+        if not self.impact_map or not self.impact_map.has_history:
+            return None
+        return self.impact_map.select(list(index.cases))
+
+    def record_impact(self, cov):
+        describe_cases = {}
+        for suite in self.suites:
+            describes = [suite]
+            while describes:
+                describe = describes.pop()
+                describes.extend(describe.describes)
+                describe_cases[describe.id] = list(describe.cases.keys())
+
+        # Only a full scan tells which of the mapped cases no longer exist
+        case_ids = self.case_ids
+        if self.arguments.select_module or self.arguments.select_tests:
+            case_ids = None
+
+        self.impact_map.record_coverage(cov.get_data(), describe_cases,
+                                        case_ids)
+        self.impact_map.save()
+
+    def get_shard_case_ids(self, indexes, select_ids):
+        """ Returns the ids of the selected cases that belong to this run's
+        shard. Cases are partitioned across all suites at once.
+        """
+        cases = []
+        for suite, index in indexes.items():
+            suite_ids = select_ids[suite]
+            cases.extend(case for case_id, case in index.cases.items()
+                         if suite_ids is None or case_id in suite_ids)
+
+        return select_shard(cases, self.arguments.shard_index,
+                            self.arguments.shard_count,
+                            self.get_shard_duration_lookup())
+
+    def execute_suites(self, select_meta):
+        suites = [suite_type() for suite_type in self.suite_types]
+        indexes = dict((suite, SuiteIndex(suite)) for suite in suites)
+        for index in indexes.values():
+            self.case_ids |= index.case_ids
+        select_ids = dict(
+            (suite, index.select(names=self.arguments.select_tests,
+                                 metadata=select_meta,
+                                 expression=self.arguments.select_expression,
+                                 ids=self.get_changed_case_ids(index)))
+            for suite, index in indexes.items())
+
+        if self.arguments.shard_count:
+            shard_ids = self.get_shard_case_ids(indexes, select_ids)
+            select_ids = dict((suite, shard_ids) for suite in suites)
+
+        # Suites are pruned here so that they don't index themselves again
+        for suite, index in indexes.items():
+            if select_ids[suite] is not None:
+                index.prune(select_ids[suite])
+
+        # Serial: Add and Execute | Parallel/Threads: Collect all to run later
+        for suite in suites:
+            self.suites.append(suite)
+            self.reporter_manager.subscribe_all_to_spec(suite)
+            if self.duration_history:
+                self.duration_history.subscribe_to_spec(suite)
+            if self.impact_map:
+                self.impact_map.subscribe_to_spec(suite)
+                suite.add_listener(TestEvent.START,
+                                   self.switch_coverage_context)
+                suite.add_listener(DescribeEvent.START,
+                                   self.switch_coverage_context)
+
+            suite.execute(parallel_manager=self.parallel_manager,
+                          thread_manager=self.thread_manager)
+
+        # Actually execute the tests for parallel now
+        if self.arguments.serve_work:
+            host, port = self.parallel_manager.listen()
+            print(_('Waiting for workers on {0}:{1}').format(host, port))
+            self.parallel_manager.execute_all()
+        elif self.arguments.parallel:
+            self.parallel_manager.execute_all()
+        elif self.thread_manager:
+            self.thread_manager.execute_all()
+
+    def run_worker(self):
+        all_cases, _parents = SuiteLocator(self.suite_types).locate()
+        worker = DistributedWorker(self.arguments.worker, all_cases)
+        worker.run()
+        print(_('Ran {0} tests for {1}:{2}').format(
+            worker.worked, *self.arguments.worker))
 
     def run(self, args):
         select_meta = None
@@ -134,12 +412,86 @@ class SpecterRunner(object):
         # Let each reporter parse cli arguments
         self.reporter_manager.process_arguments(self.arguments)
 
+        # Durations are recorded by the coordinator, not by its workers
+        if not self.arguments.no_cache and not self.arguments.worker:
+            self.duration_history = DurationHistory(self.arguments.cache_dir)
+
+        if self.arguments.changed_only:
+            if self.arguments.no_cache:
+                self.arg_parser.error(
+                    _('--changed-only cannot be used with --no-cache'))
+            self.impact_map = ImpactMap(self.arguments.cache_dir)
+        track_coverage = self.arguments.coverage or self.arguments.changed_only
+
+        cache_dir = None if self.arguments.no_cache else \
+            self.arguments.cache_dir
+        self.suite_scanner = SuiteScanner(self.arguments.search or 'spec',
+                                          cache_dir=cache_dir)
+
         if self.arguments.parallel:
             coverage.process_startup()
             self.parallel_manager = ParallelManager(
                 num_processes=self.arguments.num_processes,
-                track_coverage=self.arguments.coverage,
-                coverage_omit=self.get_coverage_omit_list())
+                track_coverage=track_coverage,
+                coverage_omit=self.get_coverage_omit_list(),
+                duration_lookup=self.get_duration_lookup(),
+                start_method=self.arguments.start_method,
+                search_paths=[self.suite_scanner.search_path],
+                coverage_data_file=self.get_coverage_data_file(),
+                record_contexts=self.arguments.changed_only,
+                case_timeout=self.arguments.case_timeout,
+                describe_affinity=self.arguments.describe_affinity,
+                async_concurrency=self.arguments.async_concurrency)
+
+        shard_args = (self.arguments.shard_index, self.arguments.shard_count)
+        if shard_args.count(None) == 1:
+            self.arg_parser.error(
+                _('--shard-index and --shard-count must be used together'))
+        if self.arguments.shard_count is not None and not (
+                0 <= self.arguments.shard_index < self.arguments.shard_count):
+            self.arg_parser.error(
+                _('--shard-index must be between 0 and --shard-count - 1'))
+        if self.arguments.shard_history:
+            if self.arguments.shard_count is None:
+                self.arg_parser.error(
+                    _('--shard-history requires --shard-count'))
+            if not os.path.isfile(self.arguments.shard_history):
+                self.arg_parser.error(
+                    _('--shard-history file {0} does not exist').format(
+                        self.arguments.shard_history))
+            self.shard_history = DurationHistory(
+                path=self.arguments.shard_history)
+
+        if self.arguments.serve_work:
+            if self.arguments.worker:
+                self.arg_parser.error(
+                    _('--serve-work cannot be used with --worker'))
+            if (self.arguments.parallel or self.arguments.num_threads or
+                    self.arguments.changed_only):
+                self.arg_parser.error(
+                    _('--serve-work cannot be used with --parallel, '
+                      '--threads or --changed-only'))
+            self.parallel_manager = DistributedManager(
+                self.arguments.serve_work,
+                num_processes=self.arguments.num_processes,
+                duration_lookup=self.get_duration_lookup(),
+                describe_affinity=self.arguments.describe_affinity)
+
+        if self.arguments.describe_affinity and not self.parallel_manager:
+            self.arg_parser.error(
+                _('--describe-affinity requires --parallel or --serve-work'))
+
+        aio.set_concurrency(self.arguments.async_concurrency)
+        set_default_timeout(self.arguments.case_timeout)
+
+        if self.arguments.num_threads:
+            if self.arguments.parallel:
+                self.arg_parser.error(
+                    _('--threads cannot be used with --parallel'))
+            if self.arguments.changed_only:
+                self.arg_parser.error(
+                    _('--threads cannot be used with --changed-only'))
+            self.thread_manager = ThreadManager(self.arguments.num_threads)
 
         if self.arguments.select_meta:
             metas = [meta.split('=') for meta in self.arguments.select_meta]
@@ -150,45 +502,47 @@ class SpecterRunner(object):
 
         if self.arguments.coverage:
             print(_(' - Running with coverage enabled - '))
-            self.coverage = coverage.coverage(
-                omit=self.get_coverage_omit_list(),
-                data_suffix=self.arguments.parallel)
+
+        if track_coverage:
+            self.coverage = self.create_coverage(
+                self.get_coverage_omit_list(), self.arguments.parallel)
             self.coverage._warn_no_data = False
             self.coverage.start()
 
-        self.suite_scanner = SuiteScanner(self.arguments.search or 'spec')
         self.suite_types = self.suite_scanner.scan(
-            self.arguments.select_module)
-
-        # Serial: Add and Execute | Parallel: Collect all with the add process
-        for suite_type in self.suite_types:
+            self.arguments.select_module, self.arguments.select_tests)
 
-            suite = suite_type()
-            self.suites.append(suite)
-            self.reporter_manager.subscribe_all_to_spec(suite)
-            suite.execute(select_metadata=select_meta,
-                          parallel_manager=self.parallel_manager,
-                          select_tests=self.arguments.select_tests)
-
-        # Actually execute the tests for parallel now
-        if self.arguments.parallel:
-            self.parallel_manager.execute_all()
+        # Workers only run what they're handed, the coordinator reports it
+        if self.arguments.worker:
+            self.run_worker()
+        else:
+            self.execute_suites(select_meta)
 
         # Save coverage data if enabled
         if self.coverage:
             self.coverage.stop()
             self.coverage.save()
 
+            cov = self.coverage
             if self.arguments.parallel:
-                self.combine_coverage_reports(
+                cov = self.combine_coverage_reports(
                     self.get_coverage_omit_list(), self.arguments.parallel)
 
+            if self.impact_map:
+                self.record_impact(cov)
+
         # Print all console summaries
-        for reporter in self.reporter_manager.get_console_reporters():
-            reporter.print_summary()
+        if not self.arguments.worker:
+            for reporter in self.reporter_manager.get_console_reporters():
+                reporter.print_summary()
 
         self.reporter_manager.finish_all()
         self.suite_scanner.destroy()
+        aio.close_event_loop()
+        set_default_timeout(None)
+
+        if self.duration_history:
+            self.duration_history.save()
 
 
 def activate():  # pragma: no cover
@@ -1,17 +1,117 @@
+import json
+import inspect
+import os
 from os import path
 from itertools import chain
 
 # from pynsive import PluginManager, rlist_classes
+from pike.discovery import filesystem, py
 from pike.manager import PikeManager
 from specter.spec import Describe
 
 
+class DiscoveryCache(object):
+    """ Stores which Describe classes and cases each spec file defines.
+
+    Entries are keyed by file path and are only used while the modification
+    time and size of the file, and of every file its classes inherit from,
+    are unchanged.
+    """
+    FILENAME = 'discovery.json'
+
+    def __init__(self, cache_dir):
+        super(DiscoveryCache, self).__init__()
+        self.path = path.join(cache_dir, self.FILENAME)
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as handle:
+                self.entries = json.load(handle)
+        except (IOError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        cache_dir = path.dirname(self.path)
+        if cache_dir and not path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+        tmp_path = '{0}.{1}.tmp'.format(self.path, os.getpid())
+        with open(tmp_path, 'w') as handle:
+            json.dump(self.entries, handle)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def get_stamp(filename):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        return [stat.st_mtime, stat.st_size]
+
+    def get(self, filename):
+        """ Returns the cached entry for a file if it's still fresh."""
+        entry = self.entries.get(filename)
+        if not entry:
+            return None
+
+        for dependency, stamp in entry['dependencies'].items():
+            if self.get_stamp(dependency) != stamp:
+                return None
+        return entry
+
+    def get_class_files(self, cls):
+        files = set()
+        for klass in cls.__get_all_child_describes__():
+            for base in inspect.getmro(klass):
+                try:
+                    files.add(path.abspath(inspect.getfile(base)))
+                except TypeError:
+                    pass
+        return files
+
+    def update(self, filename, module, classes):
+        dependencies = set([filename])
+        described = []
+
+        for cls in classes:
+            dependencies.update(self.get_class_files(cls))
+
+            describes = [cls] + list(cls.__get_all_child_describes__())
+            cases = set()
+            instances = [cls()]
+            while instances:
+                describe = instances.pop()
+                instances.extend(describe.describes)
+                for case in describe.cases.values():
+                    cases.update([case.name, case.pretty_name])
+
+            described.append({
+                'name': '{0}.{1}'.format(cls.__module__, cls.__name__),
+                'describes': sorted(set(
+                    '{0}.{1}'.format(klass.__module__, klass.__name__)
+                    for klass in describes)),
+                'cases': sorted(cases),
+            })
+
+        self.entries[filename] = {
+            'module': module.__name__,
+            'dependencies': dict((dependency, self.get_stamp(dependency))
+                                 for dependency in dependencies),
+            'classes': described,
+        }
+
+
 class SuiteScanner(object):
 
-    def __init__(self, search_path):
+    def __init__(self, search_path, cache_dir=None):
         super(SuiteScanner, self).__init__()
         self.search_path = path.abspath(search_path)
         self.plugin_manager = PikeManager([self.search_path])
+        self.discovery_cache = None
+        if cache_dir:
+            self.discovery_cache = DiscoveryCache(cache_dir)
 
     def filter_by_module_name(self, classes, name):
         found = [cls for cls in classes
@@ -26,11 +126,76 @@ class SuiteScanner(object):
 
         return found
 
-    def scan(self, module_name=None):
+    def get_module_files(self):
+        """ Yields (module name, file path) for every module that the plugin
+        manager would import from the search path.
+        """
+        for module_path in filesystem.find_modules(self.search_path):
+            yield filesystem.get_name(module_path), module_path
+
+        search_path = self.search_path
+        for package_path in filesystem.recursive_find_packages(search_path):
+            relative = path.relpath(package_path, self.search_path)
+            package_name = relative.replace(os.sep, '.')
+            yield package_name, path.join(package_path, '__init__.py')
+
+            for module_path in filesystem.find_modules(package_path):
+                name = '{0}.{1}'.format(package_name,
+                                        filesystem.get_name(module_path))
+                yield name, module_path
+
+    def is_candidate(self, entry, module_name=None, select_tests=None):
+        for described in entry['classes']:
+            if module_name and not any(module_name in name
+                                       for name in described['describes']):
+                continue
+
+            if select_tests and not set(select_tests) & set(
+                    described['cases']):
+                continue
+            return True
+        return False
+
+    def cached_scan(self, module_name=None, select_tests=None):
+        """ Imports only the modules that are either not cached or whose
+        cached entries contain matching describes or cases.
+        """
+        classes = []
+        for name, filename in self.get_module_files():
+            entry = self.discovery_cache.get(filename)
+            if entry and not self.is_candidate(entry, module_name,
+                                               select_tests):
+                continue
+
+            module = py.get_module_by_name(name)
+            module_classes = list(py.classes_in_module(
+                module, Describe.plugin_filter))
+
+            if not entry:
+                defined = [cls for cls in module_classes
+                           if cls.__module__ == module.__name__]
+                self.discovery_cache.update(filename, module, defined)
+
+            for cls in module_classes:
+                if cls not in classes:
+                    classes.append(cls)
+
+        self.discovery_cache.save()
+        return classes
+
+    def scan(self, module_name=None, select_tests=None):
         if not path.exists(path.join(self.search_path)):
             return []
 
-        classes = self.plugin_manager.get_classes(Describe.plugin_filter)
+        if self.discovery_cache and (module_name or select_tests):
+            classes = self.cached_scan(module_name, select_tests)
+        else:
+            # Specs imported into other spec modules are found more than once
+            classes = []
+            for cls in self.plugin_manager.get_classes(Describe.plugin_filter):
+                if cls not in classes:
+                    classes.append(cls)
+
         if module_name:
             classes = self.filter_by_module_name(classes, module_name)
 
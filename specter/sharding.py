@@ -0,0 +1,44 @@
+import heapq
+
+
+def estimate_durations(cases, duration_lookup=None):
+    """ Returns a {case id: estimated duration} dict. Cases without any
+    recorded history are assumed to take the average of those with one, so
+    without any history every case is considered equal.
+    """
+    known = {}
+    if duration_lookup:
+        for case in cases:
+            duration = duration_lookup(case)
+            if duration is not None:
+                known[case.id] = duration
+
+    default = sum(known.values()) / len(known) if known else 1.0
+    return dict((case.id, known.get(case.id, default)) for case in cases)
+
+
+def partition_cases(cases, shard_count, duration_lookup=None):
+    """ Splits cases into shard_count lists of case ids with roughly equal
+    estimated durations.
+
+    Cases are handed longest-first to the shard with the least work so far.
+    Ties are broken by case id and shard index, so every shard computes the
+    same partitions as long as they see the same cases and history.
+    """
+    estimates = estimate_durations(cases, duration_lookup)
+    ordered = sorted(estimates,
+                     key=lambda case_id: (-estimates[case_id], case_id))
+
+    shards = [[] for i in range(shard_count)]
+    loads = [(0.0, index) for index in range(shard_count)]
+    for case_id in ordered:
+        load, index = heapq.heappop(loads)
+        shards[index].append(case_id)
+        heapq.heappush(loads, (load + estimates[case_id], index))
+    return shards
+
+
+def select_shard(cases, shard_index, shard_count, duration_lookup=None):
+    """ Returns the set of case ids that belong to the given shard. """
+    shards = partition_cases(cases, shard_count, duration_lookup)
+    return set(shards[shard_index])
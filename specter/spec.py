@@ -1,22 +1,62 @@
+import asyncio
 import copy
 import collections
+import contextvars
 import inspect
 import itertools
 import sys
+import threading
 import time
 import types
 import uuid
+import weakref
 
 from pyevents.event import Event
 from pyevents.manager import EventDispatcher
+from specter import aio
+from specter.index import SuiteIndex
+from specter.results import ExpectRecord, ResultSummary
 from specter.util import (
-    get_real_last_traceback, convert_camelcase, find_by_metadata,
-    extract_metadata, children_with_tests_with_metadata,
-    remove_empty_entries_from_dict, find_by_names, children_with_tests_named,
+    get_real_last_traceback, convert_camelcase, extract_metadata,
+    remove_empty_entries_from_dict, time_limit,
 )
 
+_results_lock = threading.RLock()
+_current_case = contextvars.ContextVar('specter_current_case', default=None)
+_default_timeout = None
+
+# Built once per describe class and shared by all of its instances
+_state_classes = weakref.WeakKeyDictionary()
+_data_functions = weakref.WeakKeyDictionary()
+
+#: Namespace used to derive stable ids for describes and cases
+ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL,
+                          'https://github.com/jmvrbanac/Specter')
+
+
+def generate_id(*parts):
+    """ Generates a deterministic UUID string from the given parts. """
+    return str(uuid.uuid5(ID_NAMESPACE, ':'.join(parts)))
+
+
+def get_current_case():
+    """ Returns the CaseWrapper executing within the current context. """
+    return _current_case.get()
+
+
+def get_default_timeout():
+    return _default_timeout
+
+
+def set_default_timeout(seconds):
+    """ Sets the timeout for cases that don't specify their own. """
+    global _default_timeout
+    _default_timeout = seconds or None
+
 
 class TimedObject(object):
+    __slots__ = ('start_time', 'end_time')
+
     def __init__(self):
         super(TimedObject, self).__init__()
         self.start_time = 0
@@ -35,9 +75,14 @@ class TimedObject(object):
 
 
 class CaseWrapper(TimedObject):
-    def __init__(self, case_func, parent, execute_kwargs=None, metadata={}):
+    __slots__ = ('id', 'case_func', 'expects', 'parent', 'failed', 'error',
+                 'skipped', 'incomplete', 'skip_reason', 'execute_kwargs',
+                 'metadata')
+
+    def __init__(self, case_func, parent, execute_kwargs=None, metadata=None,
+                 dataset_key=None):
         super(CaseWrapper, self).__init__()
-        self.id = str(uuid.uuid4())
+        self.id = self.generate_case_id(case_func, parent, dataset_key)
         self.case_func = case_func
         self.expects = []
         self.parent = parent
@@ -47,7 +92,26 @@ class CaseWrapper(TimedObject):
         self.incomplete = False
         self.skip_reason = None
         self.execute_kwargs = execute_kwargs
-        self.metadata = metadata
+        self.metadata = metadata if metadata is not None else {}
+
+    @staticmethod
+    def generate_case_id(case_func, parent, dataset_key=None):
+        """ Case ids are derived from the parent's class path, the function
+        name and, for data-driven cases, the dataset key. This keeps them
+        stable between runs and processes.
+        """
+        if case_func is None:
+            # Nothing stable to derive an id from
+            return str(uuid.uuid4())
+
+        if parent is not None:
+            parts = [parent.real_class_path, case_func.__name__]
+        else:
+            parts = [case_func.__module__, case_func.__qualname__]
+
+        if dataset_key is not None:
+            parts.append(str(dataset_key))
+        return generate_id(*parts)
 
     def serialize(self):
         """ Serializes the CaseWrapper object for collection.
@@ -74,32 +138,113 @@ class CaseWrapper(TimedObject):
         }
         return remove_empty_entries_from_dict(converted_dict)
 
-    def execute(self, context=None):
+    @property
+    def _case_kwargs(self):
         kwargs = {}
         if self.execute_kwargs:
             kwargs.update(self.execute_kwargs)
+        return kwargs
 
-        self.start()
-        try:
-            types.MethodType(self.case_func, context or self)(**kwargs)
-        except TestIncompleteException as e:
+    def _handle_exception(self, e):
+        """ Records the outcome of an exception raised by the case. Must be
+        called from within the except block that caught it.
+        """
+        if isinstance(e, TestIncompleteException):
             self.incomplete = True
 
             # If thrown during decorators
             if e.real_func:
                 self.case_func = e.real_func
-        except TestSkippedException as e:
+        elif isinstance(e, TestSkippedException):
             self.skipped = True
             self.skip_reason = e.reason if type(e.reason) is str else ''
 
             # If thrown during decorators
             if e.real_func:
                 self.case_func = e.real_func
-        except FailedRequireException:
-            pass
-        except Exception as e:
+        elif not isinstance(e, FailedRequireException):
             self.error = get_real_last_traceback(e)
+
+    def _record_exception(self, exception):
+        """ Records an exception that wasn't raised by the case itself. """
+        try:
+            raise exception
+        except Exception as e:
+            self._handle_exception(e)
+
+    def _handle_timeout(self, seconds):
+        self._record_exception(TestTimeoutException(seconds))
+
+    async def _await_case(self, awaitable, timeout=None):
+        try:
+            if timeout:
+                await asyncio.wait_for(awaitable, timeout)
+            else:
+                await awaitable
+        except asyncio.TimeoutError as e:
+            if timeout:
+                self._handle_timeout(timeout)
+            else:
+                self._handle_exception(e)
+        except Exception as e:
+            self._handle_exception(e)
+
+    def execute(self, context=None):
+        timeout = self.timeout
+        token = _current_case.set(self)
+        self.start()
+        try:
+            # Coroutines are bounded by the event loop instead of a signal
+            signal_timeout = None if self.is_async else timeout
+            with time_limit(signal_timeout, TestTimeoutException):
+                result = types.MethodType(self.case_func, context or self)(
+                    **self._case_kwargs)
+
+            if inspect.isawaitable(result):
+                aio.run(self._await_case(result, timeout))
+        except Exception as e:
+            self._handle_exception(e)
+        finally:
+            _current_case.reset(token)
         self.stop()
+        self.compact()
+
+    async def execute_async(self, context=None):
+        token = _current_case.set(self)
+        self.start()
+        try:
+            result = types.MethodType(self.case_func, context or self)(
+                **self._case_kwargs)
+            if inspect.isawaitable(result):
+                await self._await_case(result, self.timeout)
+        except Exception as e:
+            self._handle_exception(e)
+        finally:
+            _current_case.reset(token)
+        self.stop()
+        self.compact()
+
+    def compact(self):
+        """ Replaces finished expectations with records of their outcome,
+        releasing the values they were asserting on.
+        """
+        self.expects = [ExpectRecord.from_expect(exp) for exp in self.expects]
+
+    @property
+    def timeout(self):
+        """ Seconds the case may run for. Cases without a timeout of their
+        own use the closest describe's, then the default timeout.
+        """
+        seconds = getattr(self.case_func, '__specter_timeout__', None)
+        parent = self.parent
+        while seconds is None and isinstance(parent, Describe):
+            seconds = getattr(type(parent), '__specter_timeout__', None)
+            parent = parent.parent
+        return seconds if seconds is not None else _default_timeout
+
+    @property
+    def is_async(self):
+        return inspect.iscoroutinefunction(self.case_func)
 
     @property
     def name(self):
@@ -134,13 +279,16 @@ class CaseWrapper(TimedObject):
         return safe_kwargs
 
     def __getstate__(self):
-        altered = dict(self.__dict__)
-        if 'case_func' in altered:
-            altered['case_func'] = self.id
-        if 'parent' in altered:
-            altered['parent'] = self.parent.id
+        altered = dict((name, getattr(self, name)) for name
+                       in TimedObject.__slots__ + CaseWrapper.__slots__)
+        altered['case_func'] = self.id
+        altered['parent'] = self.parent.id
         return altered
 
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __eq__(self, other):
         if isinstance(other, CaseWrapper):
             return self.id == other.id
@@ -158,13 +306,15 @@ class Describe(EventDispatcher):
 
     def __init__(self, parent=None):
         super(Describe, self).__init__()
-        self.id = str(uuid.uuid4())
-        wrappers = self.__wrappers__
         self.parent = parent
+        self.id = generate_id(self.real_class_path)
+        wrappers = self.__wrappers__
         self.cases = wrappers
         self.describes = [desc_type(parent=self)
                           for desc_type in self.describe_types]
         self._num_completed_cases = 0
+        self._num_completed_describes = 0
+        self.summary = ResultSummary()
         self._state = self.__create_state_obj__()
 
     @property
@@ -173,10 +323,35 @@ class Describe(EventDispatcher):
 
     @property
     def complete(self):
-        cases_completed = self._num_completed_cases == len(self.cases)
-        descs_not_completed = [desc for desc in self.describes
-                               if not desc.complete]
-        return cases_completed and len(descs_not_completed) == 0
+        return (self._num_completed_cases == len(self.cases) and
+                self._num_completed_describes == len(self.describes))
+
+    def _case_finished(self, case):
+        """ Adds a finished case to the totals of this describe and its
+        parents and propagates completion up the tree. Returns the describes
+        completed by it, innermost first, so each describe is only ever
+        returned once.
+        """
+        with _results_lock:
+            describe = self
+            while describe is not None:
+                describe.summary.add_case(case)
+                describe = describe.parent
+
+            self._num_completed_cases += 1
+            return self._propagate_completion()
+
+    def _propagate_completion(self):
+        # Sibling describes may finish at the same time on separate threads
+        with _results_lock:
+            completed = []
+            describe = self
+            while describe is not None and describe.complete:
+                completed.append(describe)
+                describe = describe.parent
+                if describe is not None:
+                    describe._num_completed_describes += 1
+            return completed
 
     @property
     def real_class_path(self):
@@ -195,27 +370,11 @@ class Describe(EventDispatcher):
 
     @property
     def total_time(self):
-        total = 0.0
-        for key, case in self.cases.items():
-            total += case.elapsed_time
-
-        for describe in self.describes:
-            total += describe.total_time
-
-        return total
+        return self.summary.time
 
     @property
     def success(self):
-        ok = True
-        case_successes = [case.success
-                          for key, case in self.cases.items()]
-        spec_successes = [spec.success for spec in self.describes]
-        if case_successes and False in case_successes:
-            ok = False
-
-        if spec_successes and False in spec_successes:
-            ok = False
-        return ok
+        return self.complete and self.summary.success
 
     @property
     def __wrappers__(self):
@@ -262,6 +421,24 @@ class Describe(EventDispatcher):
         return [val for key, val in self.__members__.items()
                 if Describe.case_filter(val)]
 
+    def _assign_occurrence(self, occurrence):
+        """ Derives new ids for this describe's tree so that they don't
+        collide with those of an earlier instance of the same class in a
+        run. The ids remain stable as long as suites are numbered in the
+        same order.
+        """
+        describes = [self]
+        while describes:
+            describe = describes.pop()
+            describes.extend(describe.describes)
+
+            describe.id = generate_id(describe.id, str(occurrence))
+            cases = collections.OrderedDict()
+            for case in describe.cases.values():
+                case.id = generate_id(case.id, str(occurrence))
+                cases[case.id] = case
+            describe.cases = cases
+
     @property
     def top_parent(self):
         parent_above = last_parent = self.parent or self
@@ -304,9 +481,20 @@ class Describe(EventDispatcher):
 
     def __create_state_obj__(self):
         """ Generates the clean state object magic. Here be dragons! """
+        state_cls = _state_classes.get(type(self))
+        if state_cls is None:
+            state_cls = type(self).__create_state_cls__()
+            _state_classes[type(self)] = state_cls
+
+        state = state_cls()
+        state.__spec__ = self
+        return state
+
+    @classmethod
+    def __create_state_cls__(cls):
         stops = [Describe, Spec, DataDescribe, EventDispatcher]
 
-        mros = [mro for mro in inspect.getmro(type(self)) if mro not in stops]
+        mros = [mro for mro in inspect.getmro(cls) if mro not in stops]
         mros.reverse()
 
         # Create generic object
@@ -327,71 +515,128 @@ class Describe(EventDispatcher):
         chain = [GenericStateObj]
         for mro in mros:
             cls_name = '{0}StateObj'.format(mro.__name__)
-            cls = type(cls_name, (chain[-1:][0],), dict(mro.__dict__))
-            cls.__spec__ = self
-
-            chain.append(cls)
+            chain.append(type(cls_name, (chain[-1:][0],), dict(mro.__dict__)))
 
         # Removing fallback
         chain.pop(0)
 
-        state_cls = chain[-1:][0]
-        return state_cls()
+        return chain[-1:][0]
 
     def _sort_cases(self, cases):
         sorted_cases = sorted(
             cases.items(), key=lambda case: case[1].case_func.__name__)
         return collections.OrderedDict(sorted_cases)
 
+    def _call_hook(self, name):
+        """ Calls a state hook, running it to completion if it's async. """
+        result = getattr(self._state, name)()
+        if inspect.isawaitable(result):
+            aio.run(result)
+
+    async def _call_hook_async(self, name):
+        result = getattr(self._state, name)()
+        if inspect.isawaitable(result):
+            await result
+
+    def _execute_case(self, case):
+        self._call_hook('before_each')
+        case.execute(context=self._state)
+        self._call_hook('after_each')
+        self._run_hooks()
+        self._case_finished(case)
+
+    async def _execute_case_async(self, case, semaphore, dispatch):
+        async with semaphore:
+            dispatch(TestEvent(case, TestEvent.START))
+            await self._call_hook_async('before_each')
+            await case.execute_async(context=self._state)
+            await self._call_hook_async('after_each')
+            self._run_hooks()
+            self._case_finished(case)
+            dispatch(TestEvent(case))
+
+    async def _execute_cases_async(self, concurrency, cases=None,
+                                   dispatch=None):
+        """ Runs the given cases, all of the describe's by default, with up
+        to concurrency of them at once. Their start and complete events are
+        passed to dispatch instead of the top parent's when it's given.
+        """
+        if cases is None:
+            cases = self.cases.values()
+        dispatch = dispatch or self.top_parent.dispatch
+
+        semaphore = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*[
+            self._execute_case_async(case, semaphore, dispatch)
+            for case in cases])
+
+    @property
+    def runs_concurrently(self):
+        """ Cases are overlapped only when every one of them is async. """
+        return (aio.get_concurrency() > 1 and len(self.cases) > 1 and
+                all(case.is_async for case in self.cases.values()))
+
     def parallel_execution(self, manager, select_metadata=None,
-                           select_tests=None):
+                           select_tests=None, select_ids=None):
         self.top_parent.dispatch(DescribeEvent(DescribeEvent.START, self))
-        self._state.before_all()
+
+        if manager.calls_hooks(self):
+            self._call_hook('before_all')
 
         for key, case in self.cases.items():
             manager.add_to_queue(case)
 
         for describe in self.describes:
-            describe.execute(select_metadata, select_tests, manager)
+            describe.execute(select_metadata, select_tests, manager,
+                             select_ids=select_ids)
+
+    def threaded_execution(self, manager, select_metadata=None,
+                           select_tests=None, select_ids=None):
+        manager.add_describe(self)
+
+        for describe in self.describes:
+            describe.execute(select_metadata, select_tests,
+                             select_ids=select_ids, thread_manager=manager)
 
-    def standard_execution(self, select_metadata=None, select_tests=None):
+    def standard_execution(self, select_metadata=None, select_tests=None,
+                           select_ids=None):
         self.top_parent.dispatch(DescribeEvent(DescribeEvent.START, self))
-        self._state.before_all()
+        self._call_hook('before_all')
 
         # Execute Cases
-        for key, case in self.cases.items():
-            self._state.before_each()
-            case.execute(context=self._state)
-            self._state.after_each()
-            self._run_hooks()
-            self._num_completed_cases += 1
-
-            self.top_parent.dispatch(TestEvent(case))
+        if self.runs_concurrently:
+            aio.run(self._execute_cases_async(aio.get_concurrency()))
+        else:
+            for key, case in self.cases.items():
+                self.top_parent.dispatch(TestEvent(case, TestEvent.START))
+                self._execute_case(case)
+                self.top_parent.dispatch(TestEvent(case))
 
         # Execute Suites
         for describe in self.describes:
             describe.execute(
                 select_metadata=select_metadata,
-                select_tests=select_tests
+                select_tests=select_tests,
+                select_ids=select_ids
             )
 
-        self._state.after_all()
+        self._call_hook('after_all')
 
         self.top_parent.dispatch(DescribeEvent(DescribeEvent.COMPLETE, self))
 
     def execute(self, select_metadata=None, select_tests=None,
-                parallel_manager=None):
-        if select_metadata:
-            self.cases = find_by_metadata(select_metadata, self.cases)
-            self.describes = children_with_tests_with_metadata(
-                select_metadata, self)
+                parallel_manager=None, select_ids=None, thread_manager=None):
+        if select_metadata or select_tests or select_ids is not None:
+            index = SuiteIndex(self)
+            index.prune(index.select(select_tests, select_metadata,
+                                     ids=select_ids))
 
-        if select_tests:
-            self.cases = find_by_names(select_tests, self.cases)
-            self.describes = children_with_tests_named(select_tests, self)
+            # Children are already pruned along with this describe
+            select_metadata = select_tests = select_ids = None
 
         # If it doesn't have tests or describes don't run it
         if len(self.cases) <= 0 and len(self.describes) <= 0:
+            self._propagate_completion()
             return
 
         # Sort suite case funcs to ensure stable order of execution
@@ -401,10 +646,19 @@ class Describe(EventDispatcher):
             self.parallel_execution(
                 parallel_manager,
                 select_metadata,
-                select_tests
+                select_tests,
+                select_ids
+            )
+        elif thread_manager:
+            self.threaded_execution(
+                thread_manager,
+                select_metadata,
+                select_tests,
+                select_ids
             )
         else:
-            self.standard_execution(select_metadata, select_tests)
+            self.standard_execution(select_metadata, select_tests,
+                                    select_ids)
 
     @classmethod
     def plugin_filter(cls, other):
@@ -426,7 +680,8 @@ class Describe(EventDispatcher):
             return False
 
         reserved = [
-            'execute', 'standard_execution', 'parallel_execution', 'serialize',
+            'execute', 'standard_execution', 'parallel_execution',
+            'threaded_execution', 'serialize',
             'before_each', 'after_each', 'before_all', 'after_all'
         ]
 
@@ -446,9 +701,13 @@ class DataDescribe(Describe):
         super(DataDescribe, self).__init__(parent=parent)
         self.cases = {}
 
+        # Copied functions are reused by later instances of the class
+        copied = _data_functions.setdefault(type(self), {})
+
         # Generate new functions and monkey-patch
         for case_func in self.case_funcs:
             extracted_func, base_metadata = extract_metadata(case_func)
+            default_kwargs = get_function_kwargs(extracted_func, {})
 
             for name, data in self.DATASET.items():
                 args, meta = data, dict(base_metadata)
@@ -460,13 +719,18 @@ class DataDescribe(Describe):
 
                 # Extract name, args and duplicate function
                 func_name = '{0}_{1}'.format(extracted_func.__name__, name)
-                new_func = copy_function(extracted_func, func_name)
-                kwargs = get_function_kwargs(extracted_func, args)
+                new_func = copied.get(func_name)
+                if new_func is None:
+                    new_func = copy_function(extracted_func, func_name)
+                    copied[func_name] = new_func
+                kwargs = dict(default_kwargs)
+                kwargs.update(args)
 
                 # Monkey-patch and add to cases list
                 setattr(self, func_name, new_func)
                 wrapper = CaseWrapper(new_func, parent=self,
-                                      execute_kwargs=kwargs, metadata=meta)
+                                      execute_kwargs=kwargs, metadata=meta,
+                                      dataset_key=name)
                 self.cases[wrapper.id] = wrapper
 
 
@@ -497,7 +761,9 @@ def copy_function(func, name):
     globals = (func.func_globals
                if sys.version_info < py3 else func.__globals__)
 
-    return types.FunctionType(code, globals, name)
+    new_func = types.FunctionType(code, globals, name)
+    new_func.__dict__.update(func.__dict__)
+    return new_func
 
 
 def get_function_kwargs(old_func, new_args):
@@ -523,10 +789,11 @@ class DescribeEvent(Event):
 
 
 class TestEvent(Event):
+    START = 'test_start'
     COMPLETE = 'test_complete'
 
-    def __init__(self, payload):
-        super(TestEvent, self).__init__(TestEvent.COMPLETE, payload=payload)
+    def __init__(self, payload, evt_type=COMPLETE):
+        super(TestEvent, self).__init__(evt_type, payload=payload)
 
 
 class FailedRequireException(Exception):
@@ -541,6 +808,13 @@ class TestSkippedException(Exception):
         self.real_func = other_data.get('real_func')
 
 
+class TestTimeoutException(Exception):
+    def __init__(self, seconds):
+        super(TestTimeoutException, self).__init__(
+            'Test exceeded its timeout of {0} seconds'.format(seconds))
+        self.seconds = seconds
+
+
 class TestIncompleteException(Exception):
     def __init__(self, func, reason=None, other_data={}):
         self.func = func
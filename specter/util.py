@@ -1,8 +1,15 @@
 import ast
+import bisect
+import collections
+import contextlib
 import inspect
+import linecache
+import os
 import re
 import itertools
+import signal
 import sys
+import threading
 
 from specter.vendor.ast_decompiler import decompile
 
@@ -13,6 +20,89 @@ except ImportError:
 
 CAPTURED_TRACEBACKS = []
 
+#: Code objects of Specter internals that are left out of tracebacks
+INTERNAL_CODE = set()
+SOURCE_CACHE_SIZE = 128
+
+
+class SourceIndex(object):
+    """ Parsed module source with a line number to expression lookup. """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.expressions = {}
+        self.walk_order = {}
+
+        # Keep the first expression found on each line in ast.walk() order
+        for position, node in enumerate(ast.walk(tree)):
+            if isinstance(node, ast.Expr) and \
+                    node.lineno not in self.expressions:
+                self.expressions[node.lineno] = node
+                self.walk_order[node.lineno] = position
+
+        self.lines = sorted(self.expressions)
+
+    def find_expression(self, line):
+        expression = self.expressions.get(line)
+        if expression is not None or not self.lines:
+            return expression
+
+        # Fall back on the closest expression on either side of the line
+        pos = bisect.bisect_left(self.lines, line)
+        candidates = self.lines[max(pos - 1, 0):pos + 1]
+        closest = min(candidates, key=lambda num: (abs(num - line),
+                                                   self.walk_order[num]))
+        return self.expressions[closest]
+
+
+class SourceCache(object):
+    """ Process-wide LRU cache of parsed module sources.
+
+    Entries are keyed by module name and invalidated whenever the module's
+    file modification time or size changes.
+    """
+
+    def __init__(self, max_size=SOURCE_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_file_stamp(self, module):
+        filename = getattr(module, '__file__', None)
+        try:
+            stat = os.stat(filename)
+        except (TypeError, OSError):
+            return None
+        return filename, stat.st_mtime, stat.st_size
+
+    def get_index(self, module):
+        key = module.__name__
+        stamp = self.get_file_stamp(module)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] == stamp:
+                self.entries.move_to_end(key)
+                return entry[1]
+
+        if stamp:
+            linecache.checkcache(stamp[0])
+        index = SourceIndex(ast.parse(inspect.getsource(module)))
+
+        with self.lock:
+            self.entries[key] = (stamp, index)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return index
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+SOURCE_CACHE = SourceCache()
+
 
 class ExpectParams(object):
     types_with_args = [
@@ -29,25 +119,8 @@ class ExpectParams(object):
     ]
 
     def __init__(self, line, module):
-        def distance(node):
-            return abs(node.lineno - line)
-
-        tree = ast.parse(inspect.getsource(module))
-
-        # Walk the tree until we get the expression we need
-        expect_exp = None
-        closest_exp = None
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Expr):
-                if node.lineno == line:
-                    expect_exp = node
-                    break
-
-                if (closest_exp is None or
-                        distance(node) < distance(closest_exp)):
-                    closest_exp = node
-
-        self.expect_exp = expect_exp or closest_exp
+        index = SOURCE_CACHE.get_index(module)
+        self.expect_exp = index.find_expression(line)
 
     @property
     def cmp_call(self):
@@ -89,12 +162,21 @@ def convert_camelcase(input_str):
     return re.sub(camelcase_tags, r' \1', input_str)
 
 
-def get_module_and_line(use_child_attr=None):
-    last_frame = inspect.currentframe()
+def resolve_expect_params(src_location):
+    """ Returns the ExpectParams for a (line, module name) source location
+    or None if the source can't be found.
+    """
+    line, module_name = src_location
+    module = sys.modules.get(module_name)
+    if module:
+        try:
+            return ExpectParams(line, module)
+        except (OSError, TypeError, SyntaxError):
+            pass
 
-    steps = 2
-    for i in range(steps):
-        last_frame = last_frame.f_back
+
+def get_module_and_line(use_child_attr=None, steps=2):
+    last_frame = sys._getframe(steps)
 
     self = module = last_frame.f_locals['self']
     # Use an attr instead of self
@@ -123,7 +205,8 @@ def get_source_from_frame(frame):
     return source_lines[0], module_path, source_lines[1] + line_num_modifier
 
 
-def get_all_tracebacks(tb, tb_list=[]):
+def get_all_tracebacks(tb, tb_list=None):
+    tb_list = tb_list if tb_list is not None else []
     tb_list.append(tb)
     next_tb = getattr(tb, 'tb_next')
     if next_tb:
@@ -161,7 +244,8 @@ def get_real_last_traceback(exception):
 
     # Remove already captured tracebacks
     # TODO(jmv): This must be a better way of doing this. Need to revisit.
-    tb_list = [tb for tb in tb_list if tb not in CAPTURED_TRACEBACKS]
+    tb_list = [tb for tb in tb_list if tb not in CAPTURED_TRACEBACKS and
+               tb.tb_frame.f_code not in INTERNAL_CODE]
     CAPTURED_TRACEBACKS.extend(tb_list)
 
     for traceback in tb_list:
@@ -191,17 +275,6 @@ def find_by_names(names, cases):
     return selected_cases
 
 
-def children_with_tests_named(names, describe):
-    children = []
-    for child in describe.describes:
-        found = find_by_names(names, child.cases)
-        if len(found) > 0:
-            children.append(child)
-        children.extend(children_with_tests_named(names, child))
-
-    return children
-
-
 def find_by_metadata(meta, cases):
     selected_cases = {}
     for case_id, case in cases.items():
@@ -214,14 +287,29 @@ def find_by_metadata(meta, cases):
     return selected_cases
 
 
-def children_with_tests_with_metadata(meta, describe):
-    children = []
-    for child in describe.describes:
-        found = find_by_metadata(meta, child.cases)
-        if len(found) > 0:
-            children.append(child)
-        children.extend(children_with_tests_with_metadata(meta, child))
-    return children
+@contextlib.contextmanager
+def time_limit(seconds, exception_type):
+    """ Raises exception_type(seconds) within the block once the given
+    number of seconds have elapsed. Relies on SIGALRM, so the limit is only
+    enforced on the main thread of platforms that support it.
+    """
+    enforceable = (seconds and hasattr(signal, 'SIGALRM') and
+                   threading.current_thread() is threading.main_thread())
+    if not enforceable:
+        yield
+        return
+
+    def handle_alarm(signum, frame):
+        raise exception_type(seconds)
+    INTERNAL_CODE.add(handle_alarm.__code__)
+
+    previous = signal.signal(signal.SIGALRM, handle_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
 
 
 def extract_metadata(case_func):
@@ -0,0 +1,175 @@
+import asyncio
+import time
+from unittest import TestCase
+
+from specter import aio
+from specter.expect import expect, skip, timeout
+from specter.parallel import ParallelManager, ThreadManager
+from specter.spec import Spec, get_current_case
+from specter.spec import TestEvent as CaseEvent
+
+
+class AsyncSpec(Spec):
+    async def before_all(self):
+        await asyncio.sleep(0)
+        self.ready = True
+
+    async def before_each(self):
+        await asyncio.sleep(0)
+        self.value = 1
+
+    async def passing(self):
+        await asyncio.sleep(0)
+        expect(self.ready).to.be_true()
+        expect(self.value).to.equal(1)
+
+    async def failing(self):
+        await asyncio.sleep(0)
+        expect(self.value).to.equal(2)
+
+    async def erroring(self):
+        await asyncio.sleep(0)
+        raise ValueError('boom')
+
+    @skip('Not yet')
+    async def skipped(self):
+        pass
+
+    async def knows_its_case(self):
+        await asyncio.sleep(0)
+        expect(get_current_case()).not_to.be_none()
+
+
+_ping = {}
+
+
+class OverlappingSpec(Spec):
+    async def first(self):
+        _ping['first'].set()
+        await asyncio.wait_for(_ping['second'].wait(), 5)
+
+    async def second(self):
+        _ping['second'].set()
+        await asyncio.wait_for(_ping['first'].wait(), 5)
+
+
+class BlockingSpec(Spec):
+    @timeout(0.2)
+    async def blocks(self):
+        time.sleep(30)
+
+    async def passes(self):
+        await asyncio.sleep(0)
+
+
+class TestEventLoop(TestCase):
+
+    def tearDown(self):
+        aio.close_event_loop()
+
+    def test_loop_is_reused_within_a_thread(self):
+        self.assertIs(aio.get_event_loop(), aio.get_event_loop())
+
+    def test_closed_loop_is_replaced(self):
+        loop = aio.get_event_loop()
+        aio.close_event_loop()
+        self.assertTrue(loop.is_closed())
+        self.assertIsNot(aio.get_event_loop(), loop)
+
+    def test_run(self):
+        async def sample():
+            return 'done'
+
+        self.assertEqual(aio.run(sample()), 'done')
+
+
+class TestAsyncSpecs(TestCase):
+
+    def tearDown(self):
+        aio.set_concurrency(aio.DEFAULT_CONCURRENCY)
+        aio.close_event_loop()
+
+    def record_finished(self, evt):
+        self.finished.append(evt.payload)
+
+    def get_case(self, spec, name):
+        return [case for case in spec.cases.values()
+                if case.case_func.__name__ == name][0]
+
+    def test_async_cases_and_hooks(self):
+        spec = AsyncSpec()
+        spec.execute()
+
+        self.assertTrue(spec.complete)
+        self.assertTrue(self.get_case(spec, 'passing').success)
+        self.assertTrue(self.get_case(spec, 'knows_its_case').success)
+        self.assertFalse(self.get_case(spec, 'failing').success)
+        self.assertTrue(self.get_case(spec, 'skipped').skipped)
+
+        erroring = self.get_case(spec, 'erroring')
+        self.assertFalse(erroring.success)
+        self.assertIn('raise ValueError', ''.join(erroring.error))
+
+    def test_concurrent_async_cases_overlap(self):
+        aio.set_concurrency(2)
+        loop = aio.get_event_loop()
+        _ping['first'] = asyncio.Event()
+        _ping['second'] = asyncio.Event()
+
+        spec = OverlappingSpec()
+        self.assertTrue(spec.runs_concurrently)
+        spec.execute()
+
+        self.assertIs(aio.get_event_loop(), loop)
+        self.assertTrue(spec.complete)
+        self.assertTrue(spec.success)
+
+    def test_concurrent_async_cases_overlap_on_threads(self):
+        aio.set_concurrency(2)
+        _ping['first'] = asyncio.Event()
+        _ping['second'] = asyncio.Event()
+
+        spec = OverlappingSpec()
+        self.finished = []
+        spec.add_listener(CaseEvent.COMPLETE, self.record_finished)
+
+        manager = ThreadManager(num_threads=2)
+        spec.execute(thread_manager=manager)
+        manager.execute_all()
+
+        self.assertTrue(spec.complete)
+        self.assertTrue(spec.success)
+        self.assertEqual(len(self.finished), 2)
+
+    def test_concurrent_async_cases_overlap_in_workers(self):
+        _ping['first'] = asyncio.Event()
+        _ping['second'] = asyncio.Event()
+
+        manager = ParallelManager(num_processes=2, start_method='fork',
+                                  async_concurrency=2)
+        spec = OverlappingSpec()
+        spec.execute(parallel_manager=manager)
+        self.assertEqual(len(manager.build_batches()), 1)
+        manager.execute_all()
+
+        self.assertTrue(spec.complete)
+        self.assertTrue(spec.success)
+
+    def test_stuck_concurrent_case_is_killed_in_workers(self):
+        manager = ParallelManager(num_processes=1, start_method='fork',
+                                  async_concurrency=2)
+        manager.KILL_GRACE = 0.1
+        spec = BlockingSpec()
+        spec.execute(parallel_manager=manager)
+        manager.execute_all()
+
+        # Only the stuck case is failed, the other one is run again
+        self.assertTrue(spec.complete)
+        self.assertTrue(self.get_case(spec, 'passes').success)
+        blocks = self.get_case(spec, 'blocks')
+        self.assertFalse(blocks.success)
+        self.assertIn('timeout of 0.2 seconds', blocks.error[-1])
+
+    def test_mixed_specs_run_sequentially(self):
+        aio.set_concurrency(4)
+        self.assertFalse(AsyncSpec().runs_concurrently)
@@ -0,0 +1,255 @@
+import asyncio
+import json
+import multiprocessing as mp
+import socket
+import threading
+from unittest import TestCase
+
+from specter import aio
+from specter.distributed import (DistributedManager, DistributedWorker,
+                                 parse_address)
+from specter.expect import expect
+from specter.parallel import SuiteLocator
+from specter.spec import Spec, DescribeEvent
+from specter.spec import TestEvent as CaseEvent
+
+
+class DistributedSpec(Spec):
+    def before_all(self):
+        self.ready = True
+
+    def passes(self):
+        expect(self.ready).to.be_true()
+
+    def fails(self):
+        expect(1).to.equal(2)
+
+    def errors(self):
+        raise ValueError('boom')
+
+    class Child(Spec):
+        def before_all(self):
+            self.ready = True
+
+        def also_passes(self):
+            expect(self.ready).to.be_true()
+
+
+class HookSpec(Spec):
+    calls = []
+
+    def before_all(self):
+        HookSpec.calls.append('before_all')
+
+    def after_all(self):
+        HookSpec.calls.append('after_all')
+
+    def passes(self):
+        pass
+
+
+class FailingSpec(Spec):
+    def before_all(self):
+        raise ValueError('no fixture')
+
+    def first(self):
+        pass
+
+    def second(self):
+        pass
+
+
+class OverlappingSpec(Spec):
+    async def first(self):
+        self.first_started.set()
+        await asyncio.wait_for(self.second_started.wait(), 5)
+
+    async def second(self):
+        self.second_started.set()
+        await asyncio.wait_for(self.first_started.wait(), 5)
+
+
+def _run_worker(address):
+    all_cases, all_parents = SuiteLocator([DistributedSpec]).locate()
+    worker = DistributedWorker(address, all_cases)
+
+    # Workers arriving after the run has finished shouldn't linger
+    worker.CONNECT_TIMEOUT = 1.0
+    worker.run()
+
+
+class TestParseAddress(TestCase):
+
+    def test_host_and_port(self):
+        self.assertEqual(parse_address('127.0.0.1:8000'), ('127.0.0.1', 8000))
+        self.assertEqual(parse_address('[::1]:80'), ('::1', 80))
+
+    def test_invalid_address(self):
+        for value in ('localhost', ':80', 'localhost:port'):
+            with self.assertRaises(ValueError):
+                parse_address(value)
+
+
+class TestDistributedExecution(TestCase):
+
+    def setUp(self):
+        self.processes = []
+        self.start_coordinator()
+
+    def start_coordinator(self, describe_affinity=False):
+        self.spec = DistributedSpec()
+        self.events = []
+        self.spec.add_listener(CaseEvent.COMPLETE, self.record_event)
+        self.spec.add_listener(DescribeEvent.COMPLETE, self.record_event)
+
+        self.manager = DistributedManager(
+            ('127.0.0.1', 0), num_processes=2,
+            describe_affinity=describe_affinity)
+        self.spec.execute(parallel_manager=self.manager)
+        self.address = self.manager.listen()
+
+    def tearDown(self):
+        for process in self.processes:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+
+    def record_event(self, evt):
+        self.events.append(evt)
+
+    def start_workers(self, count):
+        for i in range(count):
+            process = mp.Process(target=_run_worker, args=(self.address,))
+            process.start()
+            self.processes.append(process)
+
+    def get_case(self, describe, name):
+        return [case for case in describe.cases.values()
+                if case.case_func.__name__ == name][0]
+
+    def assert_reported(self):
+        self.assertTrue(self.spec.complete)
+
+        cases = [evt.payload for evt in self.events
+                 if evt.name == CaseEvent.COMPLETE]
+        self.assertEqual(len(cases), 4)
+        self.assertTrue(self.get_case(self.spec, 'passes').success)
+        self.assertTrue(self.get_case(self.spec.describes[0],
+                                      'also_passes').success)
+        self.assertFalse(self.get_case(self.spec, 'fails').success)
+
+        errors = self.get_case(self.spec, 'errors')
+        self.assertIn("raise ValueError('boom')", '\n'.join(errors.error))
+
+        failed = self.get_case(self.spec, 'fails').expects[0]
+        self.assertEqual(str(failed), '1 to equal 2')
+
+    def test_workers_on_loopback(self):
+        self.start_workers(2)
+        self.manager.execute_all()
+
+        self.assert_reported()
+        self.assertFalse(hasattr(self.spec._state, 'ready'))
+        for process in self.processes:
+            process.join(5)
+            self.assertEqual(process.exitcode, 0)
+
+    def test_describe_affinity(self):
+        self.manager.server.close()
+        self.start_coordinator(describe_affinity=True)
+        self.assertFalse(hasattr(self.spec._state, 'ready'))
+
+        self.start_workers(2)
+        self.manager.execute_all()
+        self.assert_reported()
+
+    def test_batch_of_disconnected_worker_is_requeued(self):
+        received = []
+
+        def disconnecting_worker():
+            sock = socket.create_connection(self.address)
+            sock.sendall(b'{"type": "ready", "results": []}\n')
+            received.append(json.loads(sock.makefile('rb').readline()))
+            sock.close()
+            self.start_workers(1)
+
+        thread = threading.Thread(target=disconnecting_worker)
+        thread.start()
+        self.manager.execute_all()
+        thread.join()
+
+        self.assertEqual(received[0]['type'], 'batch')
+        self.assert_reported()
+
+    def test_before_all_errors_are_reported_for_each_case(self):
+        all_cases, all_parents = SuiteLocator([FailingSpec]).locate()
+        worker = DistributedWorker(self.address, all_cases)
+        results = worker.run_batch({'type': 'batch',
+                                    'cases': list(all_cases)})
+
+        self.assertEqual(len(results), 2)
+        for result in results:
+            self.assertIn("raise ValueError('no fixture')",
+                          '\n'.join(result['error']))
+        self.assertEqual(worker.prepared_parents, {})
+        self.manager.server.close()
+
+    def test_async_cases_overlap(self):
+        aio.set_concurrency(2)
+        self.addCleanup(aio.set_concurrency, aio.DEFAULT_CONCURRENCY)
+
+        all_cases, all_parents = SuiteLocator([OverlappingSpec]).locate()
+        for describe in all_parents.values():
+            describe._state.first_started = asyncio.Event()
+            describe._state.second_started = asyncio.Event()
+
+        worker = DistributedWorker(self.address, all_cases)
+        results = worker.run_batch({'type': 'batch',
+                                    'cases': list(all_cases)})
+
+        self.assertEqual([result['error'] for result in results],
+                         [None, None])
+        self.assertEqual(worker.worked, 2)
+        self.manager.server.close()
+
+    def test_worker_without_coordinator_exits(self):
+        self.manager.server.close()
+        worker = DistributedWorker(self.address, {})
+        worker.CONNECT_TIMEOUT = 0.2
+
+        self.assertIsNone(worker.connect())
+        worker.run()
+
+    def test_unknown_cases_are_reported_as_errors(self):
+        worker = DistributedWorker(self.address, {})
+        result = worker.run_case('missing')
+
+        self.assertEqual(result['id'], 'missing')
+        self.assertIn('not found', result['error'][0])
+        self.manager.server.close()
+
+    def test_worker_calls_after_all_once_stopped(self):
+        self.manager.server.close()
+        server = socket.create_server(('127.0.0.1', 0))
+        self.addCleanup(server.close)
+
+        HookSpec.calls = []
+        all_cases, all_parents = SuiteLocator([HookSpec]).locate()
+        worker = DistributedWorker(server.getsockname()[:2], all_cases)
+        thread = threading.Thread(target=worker.run)
+        thread.start()
+
+        sock, address = server.accept()
+        reader = sock.makefile('rb')
+        reader.readline()
+        sock.sendall(json.dumps({'type': 'batch',
+                                 'cases': list(all_cases)}).encode() + b'\n')
+        reader.readline()
+        self.assertEqual(HookSpec.calls, ['before_all'])
+
+        # The coordinator going away stops the worker as well
+        reader.close()
+        sock.close()
+        thread.join(5)
+
+        self.assertEqual(HookSpec.calls, ['before_all', 'after_all'])
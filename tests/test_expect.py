@@ -208,6 +208,24 @@ class TestExpectAssertion(TestCase):
         self.assertEqual(params.expect_type, 'expect')
         self.assertEqual(params.cmp_type, 'equal')
 
+    def test_src_params_are_resolved_lazily(self):
+        from tests.example_data import example
+        tree = ast.parse(inspect.getsource(example))
+
+        our_expect = None
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef):
+                if node.name == 'multi_line_expect':
+                    our_expect = node
+
+        location = (our_expect.lineno + 1, example.__name__)
+        expect = ExpectAssert('this is a test', src_location=location)
+        self.assertIsNone(expect._src_params)
+
+        expect.to.equal('this is a test')
+        self.assertEqual(expect.target_src_param, "'this is a test'")
+        self.assertIsNotNone(expect._src_params)
+
     def test_expect_raise(self):
         def sample_raise_func():
             raise Exception('bam')
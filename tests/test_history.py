@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from specter.history import DurationHistory
+from specter.spec import Spec
+
+
+class DurationSpec(Spec):
+    def first_case(self):
+        pass
+
+    def second_case(self):
+        pass
+
+
+class TestDurationHistory(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.history = DurationHistory(self.cache_dir)
+        self.spec = DurationSpec()
+        self.cases = sorted(self.spec.cases.values(),
+                            key=lambda case: case.case_func.__name__)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _complete_case(self, case, elapsed):
+        case.start_time = 100.0
+        case.end_time = 100.0 + elapsed
+
+    def test_unknown_case_has_no_duration(self):
+        self.assertIsNone(self.history.get(self.cases[0]))
+
+    def test_record_computes_rolling_average(self):
+        case = self.cases[0]
+        self._complete_case(case, 1.0)
+        self.history.record(case)
+        self._complete_case(case, 3.0)
+        self.history.record(case)
+
+        self.assertEqual(self.history.get(case), 2.0)
+
+    def test_skipped_cases_are_not_recorded(self):
+        case = self.cases[0]
+        self._complete_case(case, 1.0)
+        case.skipped = True
+        self.history.record(case)
+
+        self.assertIsNone(self.history.get(case))
+
+    def test_save_and_load(self):
+        case = self.cases[0]
+        self._complete_case(case, 1.5)
+        self.history.record(case)
+        self.history.save()
+
+        self.assertTrue(os.path.exists(self.history.path))
+        self.assertEqual(DurationHistory(self.cache_dir).get(case), 1.5)
+
+    def test_load_from_path(self):
+        case = self.cases[0]
+        self._complete_case(case, 1.5)
+        self.history.record(case)
+        self.history.save()
+
+        history = DurationHistory(path=self.history.path)
+        self.assertEqual(history.get(case), 1.5)
+
+    def test_slowest(self):
+        for elapsed, case in enumerate(self.cases):
+            self._complete_case(case, elapsed + 1.0)
+            self.history.record(case)
+
+        slowest = self.history.slowest(1)
+        self.assertEqual(slowest, [(self.history.key_for(self.cases[1]),
+                                    2.0)])
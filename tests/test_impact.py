@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from specter.impact import ImpactMap
+
+
+class FakeCoverageData(object):
+    def __init__(self, contexts):
+        self.contexts = contexts
+
+    def measured_files(self):
+        return list(self.contexts.keys())
+
+    def contexts_by_lineno(self, filename):
+        return {1: self.contexts[filename]}
+
+
+class TestImpactMap(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.cache_dir, 'source.py')
+        self.other = os.path.join(self.cache_dir, 'other.py')
+        for filename in (self.source, self.other):
+            with open(filename, 'w') as handle:
+                handle.write('value = 1\n')
+
+        self.impact = ImpactMap(self.cache_dir)
+        data = FakeCoverageData({
+            self.source: ['case-a', 'describe'],
+            self.other: ['case-b', ''],
+        })
+        self.impact.record_coverage(data, {'describe': ['case-c']})
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_record_coverage_maps_contexts_to_cases(self):
+        self.assertEqual(self.impact.case_files, {
+            'case-a': [self.source],
+            'case-b': [self.other],
+            'case-c': [self.source],
+        })
+
+    def test_nothing_selected_without_changes(self):
+        selected = self.impact.select(['case-a', 'case-b', 'case-c'])
+        self.assertEqual(selected, set())
+
+    def test_cases_covering_changed_files_are_selected(self):
+        with open(self.source, 'w') as handle:
+            handle.write('value = 2\n')
+
+        selected = self.impact.select(['case-a', 'case-b', 'case-c'])
+        self.assertEqual(selected, set(['case-a', 'case-c']))
+
+    def test_touched_but_unchanged_files_are_not_selected(self):
+        os.utime(self.source, (0, 0))
+
+        selected = self.impact.select(['case-a', 'case-b', 'case-c'])
+        self.assertEqual(selected, set())
+
+    def test_stamps_wait_for_every_dependent_case(self):
+        with open(self.source, 'w') as handle:
+            handle.write('value = 2\n')
+
+        # Only case-a runs against the change, case-c still has to
+        self.impact.completed_cases = set(['case-a'])
+        data = FakeCoverageData({self.source: ['case-a']})
+        self.impact.record_coverage(data, {})
+
+        selected = self.impact.select(['case-a', 'case-b', 'case-c'])
+        self.assertEqual(selected, set(['case-a', 'case-c']))
+
+        self.impact.completed_cases = set(['case-a', 'case-c'])
+        data = FakeCoverageData({self.source: ['case-a', 'case-c']})
+        self.impact.record_coverage(data, {})
+
+        selected = self.impact.select(['case-a', 'case-b', 'case-c'])
+        self.assertEqual(selected, set())
+
+    def test_removed_cases_are_dropped(self):
+        with open(self.source, 'w') as handle:
+            handle.write('value = 2\n')
+
+        # case-c was deleted, so it'll never run against the change
+        self.impact.completed_cases = set(['case-a'])
+        data = FakeCoverageData({self.source: ['case-a', 'case-c']})
+        self.impact.record_coverage(data, {},
+                                    ['case-a', 'case-b', 'case-new'])
+
+        self.assertEqual(sorted(self.impact.case_files), ['case-a', 'case-b'])
+        selected = self.impact.select(['case-a', 'case-b'])
+        self.assertEqual(selected, set())
+
+    def test_new_and_failed_cases_are_selected(self):
+        self.impact.failed_cases.add('case-b')
+
+        selected = self.impact.select(['case-b', 'case-new'])
+        self.assertEqual(selected, set(['case-b', 'case-new']))
+
+    def test_save_and_load(self):
+        self.impact.save()
+
+        loaded = ImpactMap(self.cache_dir)
+        self.assertEqual(loaded.case_files, self.impact.case_files)
+        self.assertEqual(loaded.file_stamps, self.impact.file_stamps)
@@ -0,0 +1,108 @@
+from unittest import TestCase
+
+from specter.expect import metadata
+from specter.index import SuiteIndex, parse_expression
+from specter.spec import Describe, Spec
+
+
+class IndexedSpec(Spec):
+    @metadata(test='smoke')
+    def smoke(self):
+        pass
+
+    @metadata(test='smoke', slow=True)
+    def slow_smoke(self):
+        pass
+
+    @metadata(tags=['a', 'b'])
+    def tagged(self):
+        pass
+
+    class Nested(Describe):
+        @metadata(test='regression', slow=True)
+        def slow_regression(self):
+            pass
+
+        class Deeper(Describe):
+            def plain(self):
+                pass
+
+    class Other(Describe):
+        def smoke(self):
+            pass
+
+
+class TestSuiteIndex(TestCase):
+
+    def setUp(self):
+        self.spec = IndexedSpec()
+        self.index = SuiteIndex(self.spec)
+
+    def names(self, case_ids):
+        return sorted(self.index.cases[case_id].name for case_id in case_ids)
+
+    def test_all_cases_are_indexed(self):
+        self.assertEqual(len(self.index.cases), 6)
+
+    def test_select_by_name(self):
+        self.assertEqual(self.names(self.index.select(names=['smoke'])),
+                         ['smoke', 'smoke'])
+
+    def test_select_by_metadata(self):
+        selected = self.index.select(metadata={'test': 'smoke'})
+        self.assertEqual(self.names(selected), ['slow_smoke', 'smoke'])
+
+        selected = self.index.select(metadata={'tags': ['a', 'b']})
+        self.assertEqual(self.names(selected), ['tagged'])
+
+    def test_selectors_are_combined(self):
+        selected = self.index.select(names=['smoke'],
+                                     metadata={'test': 'smoke'})
+        self.assertEqual(self.names(selected), ['smoke'])
+        self.assertIsNone(self.index.select())
+
+    def test_prune(self):
+        selected = self.index.select(names=['plain'])
+        self.index.prune(selected)
+
+        self.assertEqual(self.spec.cases, {})
+        self.assertEqual([desc.name for desc in self.spec.describes],
+                         ['Nested'])
+        nested = self.spec.describes[0]
+        self.assertEqual(nested.cases, {})
+        self.assertEqual(list(nested.describes[0].cases), list(selected))
+
+
+class TestExpressions(TestCase):
+
+    def setUp(self):
+        self.index = SuiteIndex(IndexedSpec())
+
+    def evaluate(self, text):
+        selected = parse_expression(text).evaluate(self.index)
+        return sorted(self.index.cases[case_id].name for case_id in selected)
+
+    def test_terms(self):
+        self.assertEqual(self.evaluate('test=smoke'), ['slow_smoke', 'smoke'])
+        self.assertEqual(self.evaluate('test="regression"'),
+                         ['slow_regression'])
+        self.assertEqual(self.evaluate('slow'),
+                         ['slow_regression', 'slow_smoke'])
+
+    def test_operators(self):
+        self.assertEqual(self.evaluate('test=smoke and not slow'), ['smoke'])
+        self.assertEqual(self.evaluate('test=regression or tags'),
+                         ['slow_regression', 'tagged'])
+        self.assertEqual(self.evaluate('not (test or tags)'),
+                         ['plain', 'smoke'])
+
+    def test_precedence(self):
+        self.assertEqual(
+            self.evaluate('tags or test=smoke and not slow'),
+            ['smoke', 'tagged'])
+
+    def test_invalid_expressions(self):
+        for text in ('', 'test=smoke and', '(slow', 'slow)', 'not',
+                     '=smoke', 'slow tags'):
+            with self.assertRaises(ValueError):
+                parse_expression(text)
@@ -0,0 +1,71 @@
+from unittest import TestCase
+from xml.etree.ElementTree import fromstring
+
+from specter.merge import merge_json, merge_xunit
+
+
+def _json_report(*specs):
+    return {'format': 'specter', 'version': '0.1.0', 'specs': list(specs)}
+
+
+def _spec(spec_id, case_ids, specs=None):
+    return {'id': spec_id, 'name': spec_id, 'specs': specs or [],
+            'cases': [{'id': case_id} for case_id in case_ids]}
+
+
+class TestMergeJson(TestCase):
+
+    def test_split_specs_are_combined(self):
+        first = _json_report(_spec('a', ['1'], [_spec('b', ['2'])]))
+        second = _json_report(_spec('a', ['3'], [_spec('b', ['4'])]),
+                              _spec('c', ['5']))
+
+        merged = merge_json([first, second])
+        specs = merged['specs']
+
+        self.assertEqual([spec['id'] for spec in specs], ['a', 'c'])
+        self.assertEqual([case['id'] for case in specs[0]['cases']],
+                         ['1', '3'])
+        child = specs[0]['specs'][0]
+        self.assertEqual([case['id'] for case in child['cases']], ['2', '4'])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            merge_json([{'format': 'other', 'specs': []}])
+
+
+class TestMergeXUnit(TestCase):
+
+    def test_split_suites_are_combined(self):
+        first = fromstring(
+            '<testsuites>'
+            '<testsuite name="A" tests="1" errors="0" failures="1" '
+            'skipped="0" time="1.5">'
+            '<testcase classname="mod.A" name="one" time="1.5"/>'
+            '</testsuite>'
+            '<testsuite name="Child" tests="1" errors="0" failures="0" '
+            'skipped="0" time="1">'
+            '<testcase classname="mod.A.Child" name="two" time="1"/>'
+            '</testsuite>'
+            '</testsuites>')
+        second = fromstring(
+            '<testsuites>'
+            '<testsuite name="A" tests="1" errors="1" failures="1" '
+            'skipped="0" time="0.5">'
+            '<testcase classname="mod.A" name="three" time="0.5"/>'
+            '</testsuite>'
+            '<testsuite name="Child" tests="1" errors="0" failures="0" '
+            'skipped="1" time="0">'
+            '<testcase classname="mod.B.Child" name="four" time="0"/>'
+            '</testsuite>'
+            '</testsuites>')
+
+        merged = merge_xunit([first, second])
+        suites = merged.findall('testsuite')
+
+        self.assertEqual(len(suites), 3)
+        self.assertEqual(suites[0].get('tests'), '2')
+        self.assertEqual(suites[0].get('errors'), '1')
+        self.assertEqual(suites[0].get('failures'), '2')
+        self.assertEqual(float(suites[0].get('time')), 2.0)
+        self.assertEqual(len(suites[0].findall('testcase')), 2)
@@ -1,9 +1,16 @@
 import multiprocessing as mp
+import os
+import signal
+import tempfile
+import threading
+import time
 from unittest import TestCase
 
-from specter.spec import Spec, CaseWrapper
-from specter.expect import expect
-from specter.parallel import ParallelManager, ExecuteTestProcess
+from specter.spec import Spec, CaseWrapper, Describe, DescribeEvent
+from specter.spec import TestEvent as CaseEvent
+from specter.expect import expect, timeout
+from specter.parallel import (ParallelManager, ExecuteTestProcess,
+                              SuiteLocator, ThreadManager)
 
 
 def _create_testing_spec():
@@ -39,6 +46,14 @@ class TestParallelManager(TestCase):
         for parent in self.manager.case_parents.values():
             self.assertTrue(parent.complete)
 
+    def test_instances_of_the_same_spec_are_kept_apart(self):
+        self.assertEqual(len(self.manager.case_wrappers), 5)
+        self.assertEqual(len(self.manager.case_parents), 5)
+
+        self.manager.execute_all()
+        for suite in self.manager.suites:
+            self.assertTrue(suite.complete)
+
     def test_before_all_in_parallel(self):
         """ Make sures that the original state was sent to each process"""
         spec = BeforeAllStateSpec()
@@ -53,20 +68,428 @@ class TestParallelManager(TestCase):
             self.assertTrue(wrapper.success, wrapper.error)
 
 
+class HangingSpec(Spec):
+    def a_passes(self):
+        pass
+
+    @timeout(0.2)
+    def hangs(self):
+        # Ignore the worker's own alarm so that it has to be killed
+        signal.signal(signal.SIGALRM, signal.SIG_IGN)
+        time.sleep(30)
+
+    def z_passes(self):
+        pass
+
+
+class CrashingSpec(Spec):
+    def a_passes(self):
+        pass
+
+    def crashes(self):
+        os.kill(os.getpid(), signal.SIGKILL)
+
+    def z_passes(self):
+        pass
+
+
+class TestParallelSupervision(TestCase):
+
+    def test_crashed_worker_is_replaced(self):
+        manager = ParallelManager(num_processes=2)
+        spec = CrashingSpec()
+        spec.execute(parallel_manager=manager)
+        manager.execute_all()
+
+        self.assertTrue(spec.complete)
+        self.assertEqual(len(manager.processes), 0)
+
+        cases = dict((case.case_func.__name__, case)
+                     for case in spec.cases.values())
+        self.assertTrue(cases['a_passes'].success)
+        self.assertTrue(cases['z_passes'].success)
+        self.assertFalse(cases['crashes'].success)
+        self.assertIn('exited unexpectedly (exit code -9)',
+                      cases['crashes'].error[-1])
+
+    def test_workers_dying_at_startup_end_the_run(self):
+        def exit_at_startup(test_process):
+            os._exit(3)
+
+        run = ExecuteTestProcess.run
+        ExecuteTestProcess.run = exit_at_startup
+        self.addCleanup(setattr, ExecuteTestProcess, 'run', run)
+
+        manager = ParallelManager(num_processes=2, start_method='fork')
+        spec = BeforeAllStateSpec()
+        spec.execute(parallel_manager=manager)
+        manager.execute_all()
+
+        self.assertTrue(spec.complete)
+        self.assertEqual(len(manager.processes), 0)
+        for wrapper in spec.cases.values():
+            self.assertFalse(wrapper.success)
+            self.assertIn('exited unexpectedly (exit code 3)',
+                          wrapper.error[-1])
+
+    def test_stuck_worker_is_replaced(self):
+        manager = ParallelManager(num_processes=1)
+        manager.KILL_GRACE = 0.1
+
+        spec = HangingSpec()
+        spec.execute(parallel_manager=manager)
+        started = time.time()
+        manager.execute_all()
+
+        self.assertLess(time.time() - started, 10)
+        self.assertTrue(spec.complete)
+
+        cases = dict((case.case_func.__name__, case)
+                     for case in spec.cases.values())
+        self.assertTrue(cases['a_passes'].success)
+        self.assertTrue(cases['z_passes'].success)
+        self.assertFalse(cases['hangs'].success)
+        self.assertIn('exceeded its timeout', cases['hangs'].error[-1])
+
+
+class TestSpawnedParallelManager(TestCase):
+
+    def test_before_all_with_spawned_workers(self):
+        """ Spawned workers rebuild the suite and run before_all """
+        manager = ParallelManager(num_processes=2, start_method='spawn')
+        spec = BeforeAllStateSpec()
+        for wrapper in spec.cases.values():
+            manager.add_to_queue(wrapper)
+        manager.execute_all()
+
+        for wrapper in spec.cases.values():
+            self.assertTrue(wrapper.complete)
+            self.assertTrue(wrapper.success, wrapper.error)
+        self.assertTrue(spec.complete)
+
+    def test_hooks_are_only_called_by_spawned_workers(self):
+        hook_log = _create_hook_log()
+        self.addCleanup(os.remove, hook_log)
+
+        manager = ParallelManager(num_processes=2, start_method='spawn')
+        spec = AffinitySpec()
+        spec.execute(parallel_manager=manager)
+        manager.execute_all()
+
+        self.assertTrue(spec.complete)
+        for wrapper in spec.cases.values():
+            self.assertTrue(wrapper.success, wrapper.error)
+
+        # Each worker that ran one of its cases calls both hooks once
+        by_worker = {}
+        for name, pid in _read_hook_log(hook_log):
+            by_worker.setdefault(pid, []).append(name)
+        self.assertTrue(by_worker)
+        self.assertNotIn(str(os.getpid()), by_worker)
+        for names in by_worker.values():
+            self.assertEqual(names, ['before_all', 'after_all'])
+
+    def test_before_all_errors_in_spawned_workers(self):
+        manager = ParallelManager(num_processes=2, start_method='spawn')
+        spec = FailingBeforeAllSpec()
+        spec.execute(parallel_manager=manager)
+        manager.execute_all()
+
+        self.assertTrue(spec.complete)
+        for wrapper in spec.cases.values():
+            self.assertFalse(wrapper.success)
+            self.assertIn("raise ValueError('no fixture')",
+                          '\n'.join(wrapper.error))
+
+    def test_repeated_suites_with_spawned_workers(self):
+        manager = ParallelManager(num_processes=2, start_method='spawn')
+        specs = [BeforeAllStateSpec(), BeforeAllStateSpec()]
+        for spec in specs:
+            spec.execute(parallel_manager=manager)
+        manager.execute_all()
+
+        self.assertNotEqual(specs[0].id, specs[1].id)
+        for spec in specs:
+            self.assertTrue(spec.complete)
+            for wrapper in spec.cases.values():
+                self.assertTrue(wrapper.success, wrapper.error)
+
+
+class NestedStateSpec(Spec):
+    def before_all(self):
+        self.value = 1
+
+    def after_all(self):
+        self.value = None
+
+    def can_see_before_all(self):
+        expect(self.value).to.equal(1)
+
+    class Child(Describe):
+        def before_each(self):
+            self.value = 2
+
+        def can_see_before_each(self):
+            expect(self.value).to.equal(2)
+
+        def also_can_see_before_each(self):
+            expect(self.value).to.equal(2)
+
+    class OtherChild(Describe):
+        def passes(self):
+            pass
+
+
+_barrier = threading.Barrier(2, timeout=5)
+
+
+class FirstWaitingSpec(Spec):
+    def waits_for_other_spec(self):
+        _barrier.wait()
+
+
+class SecondWaitingSpec(Spec):
+    def waits_for_other_spec(self):
+        _barrier.wait()
+
+
+def _record_events(spec):
+    events = []
+
+    def record(evt):
+        events.append((evt.name, evt.payload.id))
+
+    for evt_type in (DescribeEvent.START, DescribeEvent.COMPLETE,
+                     CaseEvent.START, CaseEvent.COMPLETE):
+        spec.add_listener(evt_type, record)
+    return events
+
+
+class TestThreadManager(TestCase):
+
+    def test_events_match_serial_order(self):
+        serial_spec = NestedStateSpec()
+        serial_events = _record_events(serial_spec)
+        serial_spec.execute()
+
+        spec = NestedStateSpec()
+        events = _record_events(spec)
+        manager = ThreadManager(num_threads=3)
+        spec.execute(thread_manager=manager)
+        manager.execute_all()
+
+        self.assertEqual(events, serial_events)
+        self.assertTrue(spec.complete)
+        self.assertTrue(spec.success)
+
+    def test_describes_run_concurrently(self):
+        manager = ThreadManager(num_threads=2)
+        specs = [FirstWaitingSpec(), SecondWaitingSpec()]
+        for spec in specs:
+            spec.execute(thread_manager=manager)
+        manager.execute_all()
+
+        for spec in specs:
+            self.assertTrue(spec.success)
+
+    def test_hook_errors_are_raised(self):
+        class BrokenSpec(Spec):
+            def before_all(self):
+                raise ValueError('boom')
+
+            def never_runs(self):
+                pass
+
+        manager = ThreadManager(num_threads=2)
+        BrokenSpec().execute(thread_manager=manager)
+        self.assertRaises(ValueError, manager.execute_all)
+
+
+class TestSuiteLocator(TestCase):
+
+    def test_locate_rebuilds_suite_with_same_ids(self):
+        spec = BeforeAllStateSpec()
+        locator = SuiteLocator([BeforeAllStateSpec])
+        all_cases, all_parents = locator.locate()
+
+        self.assertEqual(list(all_parents.keys()), [spec.id])
+        self.assertEqual(set(all_cases.keys()), set(spec.cases.keys()))
+
+
+class TestParallelScheduling(TestCase):
+
+    def setUp(self):
+        self.manager = ParallelManager(num_processes=2)
+        self.spec = BeforeAllStateSpec()
+
+    def test_batches_are_grouped_by_parent(self):
+        other_spec, other_wrapper = _create_testing_spec()
+        for wrapper in self.spec.cases.values():
+            self.manager.add_to_queue(wrapper)
+        self.manager.add_to_queue(other_wrapper)
+
+        for batch in self.manager.build_batches():
+            self.assertEqual(len(set(case.parent.id for case in batch)), 1)
+
+    def test_batches_are_ordered_longest_first(self):
+        durations = {}
+        for num, wrapper in enumerate(self.spec.cases.values()):
+            durations[wrapper.id] = num + 1.0
+            self.manager.add_to_queue(wrapper)
+
+        self.manager.BATCHES_PER_PROCESS = 1
+        self.manager.duration_lookup = lambda case: durations[case.id]
+        batches = self.manager.build_batches()
+
+        self.assertEqual(len(batches), 2)
+        self.assertEqual(durations[batches[0][0].id], 2.0)
+
+
+class AffinitySpec(Spec):
+    def before_all(self):
+        self.pid = os.getpid()
+        _log_hook('before_all')
+
+    def after_all(self):
+        _log_hook('after_all')
+
+    def runs_in_before_all_process(self):
+        expect(self.pid).to.equal(os.getpid())
+
+    def also_runs_in_before_all_process(self):
+        expect(self.pid).to.equal(os.getpid())
+
+
+class FailingBeforeAllSpec(Spec):
+    def before_all(self):
+        raise ValueError('no fixture')
+
+    def first(self):
+        pass
+
+    def second(self):
+        pass
+
+
+class CrashingBeforeAllSpec(Spec):
+    def before_all(self):
+        os._exit(5)
+
+    def first(self):
+        pass
+
+    def second(self):
+        pass
+
+
+class HangingBeforeAllSpec(Spec):
+    def before_all(self):
+        time.sleep(30)
+
+    @timeout(0.2)
+    def first(self):
+        pass
+
+
+def _log_hook(name):
+    # Read from the environment so that spawned workers find it too
+    with open(os.environ['SPECTER_TEST_HOOK_LOG'], 'a') as handle:
+        handle.write('{0} {1}\n'.format(name, os.getpid()))
+
+
+def _create_hook_log():
+    handle, path = tempfile.mkstemp()
+    os.close(handle)
+    os.environ['SPECTER_TEST_HOOK_LOG'] = path
+    return path
+
+
+def _read_hook_log(path):
+    with open(path) as handle:
+        return [line.split() for line in handle]
+
+
+class TestDescribeAffinity(TestCase):
+
+    def setUp(self):
+        self.hook_log = _create_hook_log()
+        self.manager = ParallelManager(num_processes=2,
+                                       describe_affinity=True)
+
+    def tearDown(self):
+        os.remove(self.hook_log)
+
+    def test_describes_are_not_split(self):
+        self.manager.BATCH_SIZE = 1
+        for wrapper in AffinitySpec().cases.values():
+            self.manager.add_to_queue(wrapper)
+
+        self.assertEqual(len(self.manager.build_batches()), 1)
+
+    def test_hooks_run_once_in_the_worker(self):
+        spec = AffinitySpec()
+        spec.execute(parallel_manager=self.manager)
+        self.manager.execute_all()
+
+        self.assertTrue(spec.complete)
+        for wrapper in spec.cases.values():
+            self.assertTrue(wrapper.success, wrapper.error)
+
+        hooks = _read_hook_log(self.hook_log)
+        self.assertEqual([name for name, pid in hooks],
+                         ['before_all', 'after_all'])
+        self.assertEqual(hooks[0][1], hooks[1][1])
+        self.assertNotEqual(hooks[0][1], str(os.getpid()))
+
+    def test_before_all_errors_are_reported_for_each_case(self):
+        spec = FailingBeforeAllSpec()
+        spec.execute(parallel_manager=self.manager)
+        self.manager.execute_all()
+
+        self.assertTrue(spec.complete)
+        for wrapper in spec.cases.values():
+            self.assertFalse(wrapper.success)
+            self.assertIn("raise ValueError('no fixture')",
+                          '\n'.join(wrapper.error))
+
+    def test_crash_in_before_all_fails_the_batch(self):
+        spec = CrashingBeforeAllSpec()
+        spec.execute(parallel_manager=self.manager)
+        self.manager.execute_all()
+
+        self.assertTrue(spec.complete)
+        for wrapper in spec.cases.values():
+            self.assertFalse(wrapper.success)
+            self.assertIn('exited unexpectedly (exit code 5)',
+                          wrapper.error[-1])
+
+    def test_stuck_before_all_is_killed(self):
+        self.manager.KILL_GRACE = 0.1
+        spec = HangingBeforeAllSpec()
+        spec.execute(parallel_manager=self.manager)
+        started = time.time()
+        self.manager.execute_all()
+
+        self.assertLess(time.time() - started, 10)
+        self.assertTrue(spec.complete)
+        for wrapper in spec.cases.values():
+            self.assertIn('exceeded its timeout', wrapper.error[-1])
+
+
 class TestExecuteTestProcess(TestCase):
     def setUp(self):
         spec, wrapper = _create_testing_spec()
 
         self.parent_pipe, self.child_pipe = mp.Pipe(duplex=False)
         self.work_queue = mp.Queue()
-        self.work_queue.put(wrapper)
+        self.work_queue.put([wrapper.id])
         self.work_queue.put('STOP')
 
-        self.case_functions = {wrapper.id: wrapper.case_func}
+        self.case_wrappers = {wrapper.id: wrapper}
         self.case_parents = {wrapper.parent.id: wrapper.parent}
 
         self.test_process = ExecuteTestProcess(
-            self.work_queue, self.case_functions,
+            self.work_queue, self.case_wrappers,
             self.case_parents, self.child_pipe, track_coverage=True,
             coverage_omit=[])
 
@@ -82,3 +505,26 @@ class TestExecuteTestProcess(TestCase):
         result = self.parent_pipe.recv()
         self.assertIsNotNone(result)
         self.assertIsNotNone(self.test_process.coverage)
+
+    def test_results_are_flushed_by_count(self):
+        process = self.test_process
+        process.buffered, process.buffered_bytes = [], 0
+        process.last_flush = time.time()
+        process.FLUSH_COUNT = 2
+
+        wrapper = list(self.case_wrappers.values())[0]
+        process.buffer_result(wrapper)
+        self.assertFalse(self.parent_pipe.poll(0))
+
+        process.buffer_result(wrapper)
+        received = self.parent_pipe.recv()
+        self.assertEqual(len(received), 2)
+        self.assertEqual(process.buffered, [])
+
+    def test_slow_results_are_sent_immediately(self):
+        process = self.test_process
+        process.buffered, process.buffered_bytes = [], 0
+        process.last_flush = time.time() - process.FLUSH_INTERVAL
+
+        process.buffer_result(list(self.case_wrappers.values())[0])
+        self.assertEqual(len(self.parent_pipe.recv()), 1)
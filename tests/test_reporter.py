@@ -2,11 +2,15 @@ from unittest import TestCase
 import pytest
 
 from specter.reporting.console import ConsoleReporter
+from specter.reporting.specter_json import (SpecterJsonReporter,
+                                            assemble_json_lines)
 from specter.reporting.utils import TestStatus, pretty_print_args
 
-from specter.reporting.xunit import XUnitReporter
+from specter.reporting.xunit import XUnitReporter, XUnitTestSuite
+from specter.expect import expect, skip
 from specter.spec import DescribeEvent, Describe
 
+import json
 import os
 import xml.etree.ElementTree as ET
 
@@ -72,3 +76,108 @@ class TestXUnitReporter(TestCase):
             ET.parse(xunit_reporter.filename)
         finally:
             os.remove(xunit_reporter.filename)
+
+    def test_streams_suites_as_describes_complete(self):
+        xunit_reporter = XUnitReporter()
+        xunit_reporter.filename = 'xunit.xml'
+        spec = _JsonSample()
+        xunit_reporter.subscribe_to_spec(spec)
+        try:
+            spec.execute()
+            self.assertIsNotNone(xunit_reporter.stream)
+            self.assertEqual(xunit_reporter.suites, [])
+
+            xunit_reporter.finished()
+            suites = ET.parse(xunit_reporter.filename).getroot()
+        finally:
+            os.remove(xunit_reporter.filename)
+
+        self.assertEqual(len(suites), 2)
+        for suite in suites:
+            self.assertEqual(suite.get('tests'), '1')
+            self.assertEqual(suite.get('failures'), '0')
+
+    def test_suite_counters(self):
+        describe = _CountedSample()
+        describe.execute()
+
+        suite = XUnitTestSuite()
+        suite.assign_describe(describe)
+        self.assertEqual(len(suite.tests), 4)
+        self.assertEqual(suite.failures, '2')
+        self.assertEqual(suite.errors, '1')
+        self.assertEqual(suite.skipped, '1')
+
+
+class TestSpecterJsonReporter(TestCase):
+
+    def setUp(self):
+        self.reporter = SpecterJsonReporter()
+        self.reporter.stream_filename = 'specter_stream.jsonl'
+        self.reporter.filename = 'specter.json'
+
+    def tearDown(self):
+        for filename in (self.reporter.stream_filename,
+                         self.reporter.filename):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def run_spec(self, spec):
+        self.reporter.subscribe_to_spec(spec)
+        spec.execute()
+        self.reporter.finished()
+
+    def test_streamed_records(self):
+        spec = _JsonSample()
+        self.run_spec(spec)
+
+        with open(self.reporter.stream_filename) as handle:
+            records = [json.loads(line) for line in handle]
+
+        types = [record['type'] for record in records]
+        self.assertEqual(types.count('spec'), 2)
+        self.assertEqual(types.count('case'), 2)
+        self.assertEqual(records[0]['id'], spec.id)
+        self.assertIsNone(records[0]['parent_id'])
+
+        child = spec.describes[0]
+        child_records = [record for record in records
+                         if record.get('spec_id') == child.id]
+        self.assertEqual(len(child_records), 1)
+
+    def test_assembled_stream_matches_full_results(self):
+        self.run_spec(_JsonSample())
+
+        with open(self.reporter.stream_filename) as handle:
+            assembled = assemble_json_lines(handle)
+        with open(self.reporter.filename) as handle:
+            full = json.load(handle)
+
+        self.assertEqual(assembled, full)
+
+
+class _JsonSample(Describe):
+
+    def sample_test(self):
+        pass
+
+    class Child(Describe):
+
+        def child_test(self):
+            pass
+
+
+class _CountedSample(Describe):
+
+    def passing(self):
+        expect(True).to.be_true()
+
+    def failing(self):
+        expect(False).to.be_true()
+
+    def erroring(self):
+        raise ValueError()
+
+    @skip('Skipped')
+    def skipped(self):
+        pass
@@ -0,0 +1,144 @@
+import json
+import pickle
+import threading
+from unittest import TestCase
+
+from specter.expect import ExpectAssert, expect, incomplete, skip
+from specter.results import CaseResult, ExpectRecord, ResultSummary, render
+from specter.spec import Spec
+
+
+class ResultSpec(Spec):
+    def passes(self):
+        expect([1, 2]).to.contain(1)
+
+    def fails(self):
+        value = 'a'
+        expect(value).not_to.equal('a')
+
+    def holds_unpicklable_target(self):
+        lock = threading.Lock()
+        expect(lock).not_to.be_none()
+
+
+class StatusSpec(Spec):
+    def passes(self):
+        expect(1).to.equal(1)
+
+    def fails(self):
+        expect(1).to.equal(2)
+
+    def errors(self):
+        raise ValueError()
+
+    @skip('Not today')
+    def skipped(self):
+        pass
+
+    @incomplete
+    def not_done(self):
+        pass
+
+
+class TestExpectRecord(TestCase):
+
+    def setUp(self):
+        self.spec = ResultSpec()
+        self.spec.execute()
+
+    def get_case(self, name):
+        return [case for case in self.spec.cases.values()
+                if case.case_func.__name__ == name][0]
+
+    def test_record_renders_like_the_expect(self):
+        for target, expected in (([1, 2], 1), ('a', 'b')):
+            expect_obj = ExpectAssert(target)
+            expect_obj.to.contain(expected)
+
+            record = ExpectRecord.from_expect(expect_obj)
+            self.assertEqual(str(record), str(expect_obj))
+            self.assertEqual(record.serialize(), expect_obj.serialize())
+
+    def test_finished_cases_hold_records(self):
+        for case in self.spec.cases.values():
+            self.assertIsInstance(case.expects[0], ExpectRecord)
+
+    def test_failed_values_are_kept(self):
+        record = ExpectRecord.from_expect(self.get_case('fails').expects[0])
+        self.assertFalse(record.success)
+        self.assertEqual(record.target, 'a')
+        self.assertEqual(record.expected, 'a')
+        self.assertEqual(record.target_src_param, 'value')
+        self.assertEqual(record.expected_src_param, "'a'")
+
+    def test_passing_values_are_shortened(self):
+        self.assertEqual(render(list(range(100)), short=True),
+                         '[0, 1, 2, 3, 4, 5, ...]')
+        self.assertEqual(render('a' * 10, short=True), 'a' * 10)
+
+    def test_unprintable_values(self):
+        class Unprintable(object):
+            def __str__(self):
+                raise ValueError()
+
+        self.assertIn('ERROR', render(Unprintable()))
+
+
+class TestCaseResult(TestCase):
+
+    def test_round_trip(self):
+        spec = ResultSpec()
+        spec.execute()
+
+        for case in spec.cases.values():
+            result = pickle.loads(pickle.dumps(CaseResult.from_wrapper(case)))
+            self.assertEqual(result.id, case.id)
+
+            other = ResultSpec().cases[case.id]
+            result.apply_to(other)
+            self.assertEqual(other.success, case.success)
+            self.assertEqual(other.elapsed_time, case.elapsed_time)
+            self.assertEqual([str(exp) for exp in other.expects],
+                             [str(exp) for exp in case.expects])
+
+    def test_json_round_trip(self):
+        spec = ResultSpec()
+        spec.execute()
+
+        for case in spec.cases.values():
+            data = json.loads(json.dumps(
+                CaseResult.from_wrapper(case).to_dict()))
+            result = CaseResult.from_dict(data)
+
+            other = ResultSpec().cases[case.id]
+            result.apply_to(other)
+            self.assertEqual(other.success, case.success)
+            self.assertEqual([str(exp) for exp in other.expects],
+                             [str(exp) for exp in case.expects])
+
+
+class TestResultSummary(TestCase):
+
+    def test_cases_are_counted_by_status(self):
+        spec = StatusSpec()
+        spec.execute()
+
+        summary = spec.summary
+        self.assertEqual(summary.total, 5)
+        self.assertEqual((summary.passed, summary.failed, summary.errored,
+                          summary.skipped, summary.incomplete),
+                         (1, 1, 1, 1, 1))
+        self.assertEqual(summary.expects, 2)
+        self.assertFalse(summary.success)
+        self.assertFalse(spec.success)
+
+    def test_combine(self):
+        first, second = ResultSpec(), StatusSpec()
+        first.execute()
+        second.execute()
+
+        combined = ResultSummary.combine([first.summary, second.summary])
+        self.assertEqual(combined.total, 8)
+        self.assertEqual(combined.failed, 2)
+        self.assertEqual(combined.time,
+                         first.total_time + second.total_time)
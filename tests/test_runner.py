@@ -1,7 +1,14 @@
+import multiprocessing as mp
+import os
+import shutil
+import socket
+import sys
+import tempfile
 from unittest import TestCase
 
 from specter.runner import SpecterRunner
 from specter.reporting.console import ConsoleReporter
+from specter.reporting.dots import DotsReporter
 
 
 class TestSpecterRunner(TestCase):
@@ -92,6 +99,20 @@ class TestSpecterRunner(TestCase):
         self.assertEqual(len(self.runner.suite_types), 4)
         self.assertEqual(reporter.test_total, 1)
 
+    def test_run_w_select_by_expression(self):
+        self.runner.run(args=['--search', './tests/example_data', '--no-art',
+                              '--select-by-expression',
+                              'not test=smoke and not test=other'])
+        reporter = self.get_console_reporter(
+            self.runner.reporter_manager.reporters)
+
+        self.assertEqual(reporter.test_total, 11)
+
+    def test_run_w_invalid_expression(self):
+        with self.assertRaises(SystemExit):
+            self.runner.run(args=['--no-art', '--select-by-expression',
+                                  'test=smoke and'])
+
     def test_run_w_xunit(self):
         self.runner.run(args=['--search', './tests/example_data', '--no-art',
                               '--xunit-result', './sample_xunit.xml'])
@@ -106,3 +127,168 @@ class TestSpecterRunner(TestCase):
         self.runner.run(args=['--search', './tests/example_data', '--no-art',
                               '--parallel'])
         self.assertEqual(len(self.runner.suite_types), 4)
+
+    def test_run_w_threads(self):
+        self.runner.run(args=['--search', './tests/example_data', '--no-art',
+                              '--threads', '4'])
+        self.assertEqual(len(self.runner.suite_types), 4)
+        for suite in self.runner.suites:
+            self.assertTrue(suite.complete)
+
+    def test_run_w_distributed_workers(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        address = '127.0.0.1:{0}'.format(sock.getsockname()[1])
+        sock.close()
+
+        worker = mp.Process(target=SpecterRunner().run, args=(
+            ['--search', './tests/example_data', '--no-art',
+             '--worker', address],))
+        worker.start()
+        self.runner.run(args=['--search', './tests/example_data', '--no-art',
+                              '--serve-work', address])
+        worker.join(10)
+
+        self.assertEqual(worker.exitcode, 0)
+        for suite in self.runner.suites:
+            self.assertTrue(suite.complete)
+
+    def test_run_w_parallel_and_imported_spec(self):
+        search_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, search_path)
+        with open(os.path.join(search_path, 'runner_origin.py'), 'w') as f:
+            f.write('from specter import Spec\n\n\n'
+                    'class OriginSpec(Spec):\n'
+                    '    def first(self):\n        pass\n\n'
+                    '    def second(self):\n        pass\n')
+        with open(os.path.join(search_path, 'runner_reuse.py'), 'w') as f:
+            f.write('from specter import Spec\n'
+                    'from runner_origin import OriginSpec  # noqa\n\n\n'
+                    'class ReuseSpec(Spec):\n'
+                    '    def third(self):\n        pass\n')
+        for module in ('runner_origin', 'runner_reuse'):
+            self.addCleanup(sys.modules.pop, module, None)
+
+        self.runner.run(args=['--search', search_path, '--no-art',
+                              '--parallel', '--no-cache'])
+        reporter = [r for r in self.runner.reporter_manager.reporters
+                    if type(r) is DotsReporter][0]
+
+        self.assertEqual(reporter.total, 3)
+        for suite in self.runner.suites:
+            self.assertTrue(suite.complete)
+            self.assertTrue(suite.success)
+
+    def test_run_w_serve_work_and_parallel(self):
+        with self.assertRaises(SystemExit):
+            self.runner.run(args=['--no-art', '--parallel',
+                                  '--serve-work', '127.0.0.1:0'])
+
+    def test_run_w_describe_affinity(self):
+        self.runner.run(args=['--search', './tests/example_data', '--no-art',
+                              '--parallel', '--describe-affinity'])
+        self.assertTrue(self.runner.parallel_manager.describe_affinity)
+        for suite in self.runner.suites:
+            self.assertTrue(suite.complete)
+
+    def test_run_w_describe_affinity_without_parallel(self):
+        with self.assertRaises(SystemExit):
+            self.runner.run(args=['--no-art', '--describe-affinity'])
+
+    def test_run_w_async_concurrency_and_parallel(self):
+        self.runner.run(args=['--search', './tests/example_data', '--no-art',
+                              '--parallel', '--async-concurrency', '4'])
+        self.assertEqual(self.runner.parallel_manager.async_concurrency, 4)
+        for suite in self.runner.suites:
+            self.assertTrue(suite.complete)
+
+    def test_run_w_case_timeout(self):
+        self.runner.run(args=['--search', './tests/example_data', '--no-art',
+                              '--parallel', '--case-timeout', '30'])
+        self.assertEqual(self.runner.parallel_manager.case_timeout, 30)
+        for suite in self.runner.suites:
+            self.assertTrue(suite.complete)
+
+    def test_run_w_parallel_spawn(self):
+        self.runner.run(args=['--search', './tests/example_data', '--no-art',
+                              '--parallel', '--start-method', 'spawn'])
+        self.assertEqual(len(self.runner.suite_types), 4)
+
+    def test_run_w_changed_only(self):
+        cache_dir = tempfile.mkdtemp()
+        args = ['--search', './tests/example_data', '--no-art',
+                '--changed-only', '--cache-dir', cache_dir]
+        try:
+            self.runner.run(args=args)
+            reporter = self.get_console_reporter(
+                self.runner.reporter_manager.reporters)
+            self.assertEqual(reporter.test_total, 12)
+            failing = reporter.failed_tests + reporter.errored_tests
+
+            # Only previously failing tests are affected on the next run
+            runner = SpecterRunner()
+            runner.run(args=args)
+            reporter = self.get_console_reporter(
+                runner.reporter_manager.reporters)
+            self.assertEqual(reporter.test_total, failing)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def run_shards(self, *args):
+        case_ids = []
+        for index in range(3):
+            runner = SpecterRunner()
+            runner.run(args=['--search', './tests/example_data', '--no-art',
+                             '--shard-index', str(index),
+                             '--shard-count', '3'] + list(args))
+            for suite in runner.suites:
+                describes = [suite]
+                while describes:
+                    describe = describes.pop()
+                    describes.extend(describe.describes)
+                    case_ids.extend(describe.cases.keys())
+        return case_ids
+
+    def test_run_w_shards(self):
+        case_ids = self.run_shards('--no-cache')
+
+        # Every test runs on exactly one of the shards
+        self.assertEqual(len(case_ids), 12)
+        self.assertEqual(len(set(case_ids)), 12)
+
+    def test_run_w_shards_sharing_a_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            # Each shard records its durations, which mustn't change the
+            # partitions of the shards run after it
+            case_ids = self.run_shards('--cache-dir', cache_dir)
+            self.assertTrue(os.listdir(cache_dir))
+            self.assertEqual(len(case_ids), 12)
+            self.assertEqual(len(set(case_ids)), 12)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_run_w_shard_history(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            self.runner.run(args=['--search', './tests/example_data',
+                                  '--no-art', '--cache-dir', cache_dir])
+            history = os.path.join(cache_dir, 'durations.json')
+
+            case_ids = self.run_shards('--no-cache', '--shard-history',
+                                       history)
+            self.assertEqual(len(case_ids), 12)
+            self.assertEqual(len(set(case_ids)), 12)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_run_w_missing_shard_history(self):
+        with self.assertRaises(SystemExit):
+            self.runner.run(args=['--no-art', '--shard-index', '0',
+                                  '--shard-count', '3', '--shard-history',
+                                  'missing.json'])
+
+    def test_run_w_shard_index_out_of_range(self):
+        with self.assertRaises(SystemExit):
+            self.runner.run(args=['--no-art', '--shard-index', '3',
+                                  '--shard-count', '3'])
@@ -0,0 +1,109 @@
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+from specter.scanner import SuiteScanner
+
+SPEC_TEMPLATE = """
+from specter import Spec
+
+
+class {name}(Spec):
+    def {case}(self):
+        pass
+"""
+
+
+class TestSuiteScannerCache(TestCase):
+
+    def setUp(self):
+        self.search_path = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.modules = ['scanner_cache_first', 'scanner_cache_second']
+
+        for num, module in enumerate(self.modules):
+            filename = os.path.join(self.search_path, module + '.py')
+            with open(filename, 'w') as handle:
+                handle.write(SPEC_TEMPLATE.format(
+                    name='CachedSpec{0}'.format(num),
+                    case='cached_case_{0}'.format(num)))
+
+    def tearDown(self):
+        for module in self.modules:
+            sys.modules.pop(module, None)
+        shutil.rmtree(self.search_path)
+        shutil.rmtree(self.cache_dir)
+
+    def _scan(self, module_name=None, select_tests=None):
+        scanner = SuiteScanner(self.search_path, cache_dir=self.cache_dir)
+        try:
+            return scanner.scan(module_name, select_tests)
+        finally:
+            scanner.destroy()
+
+    def _forget_modules(self):
+        for module in self.modules:
+            sys.modules.pop(module, None)
+
+    def test_select_module_only_imports_matching_files(self):
+        self._scan('CachedSpec1')
+        self._forget_modules()
+
+        classes = self._scan('CachedSpec1')
+        self.assertEqual([cls.__name__ for cls in classes], ['CachedSpec1'])
+        self.assertNotIn('scanner_cache_first', sys.modules)
+
+    def test_select_tests_only_imports_matching_files(self):
+        self._scan(select_tests=['cached_case_0'])
+        self._forget_modules()
+
+        classes = self._scan(select_tests=['cached_case_0'])
+        self.assertEqual([cls.__name__ for cls in classes], ['CachedSpec0'])
+        self.assertNotIn('scanner_cache_second', sys.modules)
+
+    def test_changed_files_are_rescanned(self):
+        self._scan('CachedSpec1')
+        self._forget_modules()
+
+        filename = os.path.join(self.search_path, self.modules[0] + '.py')
+        with open(filename, 'w') as handle:
+            handle.write(SPEC_TEMPLATE.format(name='CachedSpec1Renamed',
+                                              case='renamed_case'))
+
+        classes = self._scan('CachedSpec1')
+        self.assertEqual(sorted(cls.__name__ for cls in classes),
+                         ['CachedSpec1', 'CachedSpec1Renamed'])
+
+
+class TestSuiteScannerImports(TestCase):
+
+    def setUp(self):
+        self.search_path = tempfile.mkdtemp()
+        self.modules = ['scanner_import_origin', 'scanner_import_reuse']
+
+        with open(os.path.join(self.search_path, self.modules[0] + '.py'),
+                  'w') as handle:
+            handle.write(SPEC_TEMPLATE.format(name='ImportedSpec',
+                                              case='imported_case'))
+        with open(os.path.join(self.search_path, self.modules[1] + '.py'),
+                  'w') as handle:
+            handle.write('from scanner_import_origin import ImportedSpec\n')
+            handle.write(SPEC_TEMPLATE.format(name='ReusingSpec',
+                                              case='reusing_case'))
+
+    def tearDown(self):
+        for module in self.modules:
+            sys.modules.pop(module, None)
+        shutil.rmtree(self.search_path)
+
+    def test_imported_specs_are_found_once(self):
+        scanner = SuiteScanner(self.search_path)
+        try:
+            classes = scanner.scan()
+        finally:
+            scanner.destroy()
+
+        self.assertEqual(sorted(cls.__name__ for cls in classes),
+                         ['ImportedSpec', 'ReusingSpec'])
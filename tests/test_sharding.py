@@ -0,0 +1,57 @@
+from unittest import TestCase
+
+from specter.sharding import estimate_durations, partition_cases, select_shard
+from specter.spec import CaseWrapper, Spec
+
+
+class ShardedSpec(Spec):
+    pass
+
+
+def _create_cases(count):
+    spec = ShardedSpec()
+    cases = []
+    for i in range(count):
+        def sample_func():
+            pass
+        sample_func.__name__ = 'case_{0}'.format(i)
+        cases.append(CaseWrapper(sample_func, spec))
+    return cases
+
+
+class TestSharding(TestCase):
+
+    def setUp(self):
+        self.cases = _create_cases(10)
+
+    def test_partitions_are_disjoint_and_complete(self):
+        shards = partition_cases(self.cases, 3)
+
+        case_ids = [case_id for shard in shards for case_id in shard]
+        self.assertEqual(sorted(case_ids),
+                         sorted(case.id for case in self.cases))
+        self.assertEqual(sorted(len(shard) for shard in shards), [3, 3, 4])
+
+    def test_partitions_are_deterministic(self):
+        shards = partition_cases(self.cases, 3)
+        self.assertEqual(partition_cases(list(reversed(self.cases)), 3),
+                         shards)
+
+    def test_balanced_by_duration(self):
+        durations = dict((case.id, 1.0) for case in self.cases)
+        durations[self.cases[0].id] = 9.0
+
+        shards = partition_cases(self.cases, 2,
+                                 lambda case: durations.get(case.id))
+        self.assertIn([self.cases[0].id], shards)
+
+    def test_unknown_durations_use_the_average(self):
+        durations = {self.cases[0].id: 2.0, self.cases[1].id: 4.0}
+        estimates = estimate_durations(
+            self.cases, lambda case: durations.get(case.id))
+
+        self.assertEqual(estimates[self.cases[1].id], 4.0)
+        self.assertEqual(estimates[self.cases[2].id], 3.0)
+
+    def test_more_shards_than_cases(self):
+        self.assertEqual(select_shard(self.cases[:2], 4, 5), set())
@@ -2,12 +2,18 @@ try:
     from unittest2 import TestCase
 except ImportError:
     from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
 from time import sleep
+import asyncio
 import types
 
+from specter.expect import expect, metadata, timeout
+from specter.results import ExpectRecord
 from specter.spec import (TimedObject, CaseWrapper, Spec, Describe,
                           DataSpec, copy_function, get_function_kwargs,
-                          convert_to_hashable)
+                          convert_to_hashable, get_current_case,
+                          set_default_timeout)
+from specter.spec import TestEvent as CaseEvent
 
 
 class TestTimedObject(TestCase):
@@ -60,6 +66,44 @@ class TestCaseWrapper(TestCase):
         self.assertIsNotNone(self.wrapper.error)
         self.assertIs(type(self.wrapper.error), list)
 
+    def test_current_case_is_published_during_execution(self):
+        seen = []
+        self.wrapper = CaseWrapper(
+            case_func=lambda s: seen.append(get_current_case()), parent=None)
+        self.wrapper.execute()
+
+        self.assertEqual(seen, [self.wrapper])
+        self.assertIsNone(get_current_case())
+
+    def test_expects_are_added_from_other_threads(self):
+        def threaded_handler(self):
+            expect(True).to.be_true()
+
+        wrappers = [CaseWrapper(case_func=threaded_handler, parent=None)
+                    for _ in range(4)]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda wrapper: wrapper.execute(), wrappers))
+
+        for wrapper in wrappers:
+            self.assertEqual(len(wrapper.expects), 1)
+
+    def test_expects_are_compacted_once_finished(self):
+        def handler(self):
+            expect([1, 2]).to.contain(1)
+
+        self.wrapper = CaseWrapper(case_func=handler, parent=None)
+        self.wrapper.execute()
+
+        record = self.wrapper.expects[0]
+        self.assertIsInstance(record, ExpectRecord)
+        self.assertEqual(record.target, '[1, 2]')
+        self.assertTrue(self.wrapper.success)
+
+    def test_wrappers_are_slotted(self):
+        other = CaseWrapper(case_func=self.example_handler, parent=None)
+        self.assertFalse(hasattr(self.wrapper, '__dict__'))
+        self.assertIsNot(self.wrapper.metadata, other.metadata)
+
     def test_name_property(self):
         self.assertEqual(self.wrapper.name, 'example_handler')
 
@@ -111,6 +155,16 @@ class TestSpecDescribe(TestCase):
     def test_success_property(self):
         self.assertFalse(self.spec.success)
 
+    def test_state_classes_are_shared(self):
+        other = ExampleSpec()
+        self.assertIs(type(other._state), type(self.spec._state))
+        self.assertIsNot(other._state, self.spec._state)
+        self.assertIs(self.spec._state.__spec__, self.spec)
+        self.assertIs(other._state.__spec__, other)
+
+        self.spec._state.value = 1
+        self.assertFalse(hasattr(other._state, 'value'))
+
     def test_execute_with_hooks(self):
         hook1_calls = []
         spec = ExampleSpec()
@@ -129,6 +183,82 @@ class TestSpecDescribe(TestCase):
         self.assertTrue(spec.complete)
 
 
+class NestedSpec(Spec):
+    def outer(self):
+        pass
+
+    class Middle(Describe):
+        def other(self):
+            pass
+
+        class Inner(Describe):
+            @metadata(tag='inner')
+            def inner(self):
+                pass
+
+    class Empty(Describe):
+        pass
+
+
+class _QueueingManager(object):
+
+    def __init__(self):
+        self.cases = []
+
+    def calls_hooks(self, describe):
+        return True
+
+    def add_to_queue(self, case):
+        self.cases.append(case)
+
+
+class TestDescribeCompletion(TestCase):
+
+    def test_completion_propagates_once(self):
+        spec = NestedSpec()
+        manager = _QueueingManager()
+        spec.execute(parallel_manager=manager)
+
+        # The empty describe completes as soon as it's executed
+        self.assertFalse(spec.complete)
+        self.assertEqual(spec._num_completed_describes, 1)
+
+        completed = [[desc.name for desc in case.parent._case_finished(case)]
+                     for case in manager.cases]
+        self.assertEqual(completed, [[], [], ['Inner', 'Middle',
+                                              'Nested Spec']])
+        self.assertTrue(spec.complete)
+
+    def test_nested_selections_run_once(self):
+        for selection in ({'select_tests': ['inner']},
+                          {'select_metadata': {'tag': 'inner'}}):
+            spec = NestedSpec()
+            completed = []
+            spec.add_listener(CaseEvent.COMPLETE,
+                              lambda evt: completed.append(evt.payload))
+            spec.execute(**selection)
+
+            self.assertEqual([case.name for case in completed], ['inner'])
+            self.assertEqual([desc.name for desc in spec.describes],
+                             ['Middle'])
+            self.assertTrue(spec.complete)
+
+    def test_totals_are_kept_per_describe(self):
+        spec = NestedSpec()
+        spec.execute()
+
+        middle = spec.describes[0]
+        self.assertEqual(spec.summary.total, 3)
+        self.assertEqual(middle.summary.total, 2)
+        self.assertEqual(middle.describes[0].summary.passed, 1)
+
+        cases = list(middle.cases.values())
+        cases += list(middle.describes[0].cases.values())
+        self.assertEqual(middle.total_time,
+                         sum(case.elapsed_time for case in cases))
+        self.assertTrue(spec.success)
+
+
 # Data class structure used for testing
 class ExampleDataSpec(DataSpec):
     DATASET = {
@@ -147,6 +277,13 @@ class TestDataSpec(TestCase):
     def setUp(self):
         self.spec = ExampleDataSpec()
 
+    def test_case_ids_are_deterministic(self):
+        other = ExampleDataSpec()
+        self.assertEqual(self.spec.id, other.id)
+        self.assertEqual(set(self.spec.cases.keys()),
+                         set(other.cases.keys()))
+        self.assertEqual(len(self.spec.cases), 4)
+
     def test_functions(self):
         funcs = [
             getattr(self.spec, 'tracer_test'),
@@ -159,6 +296,13 @@ class TestDataSpec(TestCase):
         for func in funcs:
             self.assertIsInstance(func, types.FunctionType)
 
+    def test_functions_are_copied_once(self):
+        other = ExampleDataSpec()
+        self.assertIs(other.tracer_test, self.spec.tracer_test)
+        for case_id, case in other.cases.items():
+            self.assertEqual(case.execute_kwargs,
+                             self.spec.cases[case_id].execute_kwargs)
+
 
 class TestSpecHelpers(TestCase):
 
@@ -196,3 +340,67 @@ class TestConvertToHashable(TestCase):
 
     def test_dict_with_list_of_dict_values(self):
         hash(convert_to_hashable({'a': [{}, {}], 'b': [{}, {}]}))
+
+
+@timeout(5)
+class TimeoutSpec(Spec):
+
+    @timeout(0.05)
+    def hangs(self):
+        sleep(5)
+
+    @metadata(type='slow')
+    @timeout(0.05)
+    def hangs_with_metadata(self):
+        sleep(5)
+
+    @timeout(0.05)
+    async def hangs_async(self):
+        await asyncio.sleep(5)
+
+    def uses_spec_timeout(self):
+        pass
+
+    class Inherited(Describe):
+        def uses_parent_timeout(self):
+            pass
+
+
+class TestCaseTimeouts(TestCase):
+
+    def tearDown(self):
+        set_default_timeout(None)
+
+    def get_case(self, spec, name):
+        return [case for case in spec.cases.values()
+                if case.case_func.__name__ == name][0]
+
+    def test_timeout_lookup(self):
+        spec = TimeoutSpec()
+        self.assertEqual(self.get_case(spec, 'hangs').timeout, 0.05)
+        self.assertEqual(
+            self.get_case(spec, 'hangs_with_metadata').timeout, 0.05)
+        self.assertEqual(self.get_case(spec, 'uses_spec_timeout').timeout, 5)
+
+        child = spec.describes[0]
+        case = self.get_case(child, 'uses_parent_timeout')
+        self.assertEqual(case.timeout, 5)
+
+    def test_default_timeout(self):
+        wrapper = CaseWrapper(lambda self: None, parent=None)
+        self.assertIsNone(wrapper.timeout)
+
+        set_default_timeout(2)
+        self.assertEqual(wrapper.timeout, 2)
+
+    def test_hanging_cases_are_stopped(self):
+        spec = TimeoutSpec()
+        spec.execute(select_tests=['hangs', 'hangs_with_metadata',
+                                   'hangs_async'])
+
+        self.assertEqual(len(spec.cases), 3)
+        for case in spec.cases.values():
+            self.assertFalse(case.success)
+            self.assertLess(case.elapsed_time, 1)
+            self.assertIn('exceeded its timeout of 0.05 seconds',
+                          case.error[-1])
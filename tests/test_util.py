@@ -61,3 +61,32 @@ class TestSpecterUtil(TestCase):
             OldStyleClass().throw()
         except Exception as e:
             util.get_real_last_traceback(e)
+
+
+class TestSourceCache(TestCase):
+
+    def setUp(self):
+        self.cache = util.SourceCache(max_size=1)
+
+    def test_get_index_is_cached(self):
+        from tests.example_data import example
+
+        index = self.cache.get_index(example)
+        self.assertIs(self.cache.get_index(example), index)
+
+    def test_get_index_evicts_least_recently_used(self):
+        from tests.example_data import example, example_fixture
+
+        index = self.cache.get_index(example)
+        self.cache.get_index(example_fixture)
+
+        self.assertEqual(len(self.cache.entries), 1)
+        self.assertIsNot(self.cache.get_index(example), index)
+
+    def test_find_expression_falls_back_to_closest(self):
+        from tests.example_data import example
+
+        index = self.cache.get_index(example)
+        line = index.lines[0]
+        self.assertIs(index.find_expression(line - 1),
+                      index.expressions[line])